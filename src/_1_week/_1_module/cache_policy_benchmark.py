@@ -0,0 +1,96 @@
+import argparse
+import itertools
+import random
+import time
+import tracemalloc
+
+from eviction_policies import POLICIES
+from lru_cache import lru_cache
+
+TRACE_LENGTH = 200000
+KEYS = 50000
+ZIPF_S = 0.9
+SCAN_LENGTH = 5000
+SCAN_EVERY = 20000
+
+
+def zipf_trace(length=TRACE_LENGTH, keys=KEYS, s=ZIPF_S, seed=0):
+    """Синтетическая трасса с распределением Ципфа: ключ i встречается с вероятностью ~ 1 / i^s."""
+    rng = random.Random(seed)
+    cum_weights = list(itertools.accumulate(1 / i**s for i in range(1, keys + 1)))
+    return rng.choices(range(keys), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(
+    length=TRACE_LENGTH,
+    keys=KEYS,
+    s=ZIPF_S,
+    scan_length=SCAN_LENGTH,
+    scan_every=SCAN_EVERY,
+    seed=0,
+):
+    """Трасса Ципфа, в которую регулярно вставляются последовательные сканы по одноразовым ключам."""
+    trace = []
+    scan_key = keys
+    for i, key in enumerate(zipf_trace(length, keys, s, seed)):
+        if i and i % scan_every == 0:
+            trace.extend(range(scan_key, scan_key + scan_length))
+            scan_key += scan_length
+        trace.append(key)
+    return trace
+
+
+def load_trace(path):
+    """Загружает записанную трассу: по одному ключу на строку."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def replay(trace, policy, maxsize):
+    """Прогоняет трассу через кэш и возвращает долю попаданий, операции в секунду и память в байтах."""
+    cached = lru_cache(maxsize=maxsize, policy=policy)(lambda key: key)
+    start = time.perf_counter()
+    for key in trace:
+        cached(key)
+    elapsed = time.perf_counter() - start
+    info = cached.cache_info()
+
+    # Память меряем отдельным прогоном, так как tracemalloc сильно замедляет выполнение
+    cached = lru_cache(maxsize=maxsize, policy=policy)(lambda key: key)
+    tracemalloc.start()
+    for key in trace:
+        cached(key)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return info.hits / len(trace), len(trace) / elapsed, memory
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Сравнение политик вытеснения lru_cache на трассах ключей"
+    )
+    parser.add_argument("--trace", help="Файл с трассой, по одному ключу на строку")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Размеры кэша"
+    )
+    parser.add_argument(
+        "--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES)
+    )
+    args = parser.parse_args()
+
+    if args.trace:
+        traces = {args.trace: load_trace(args.trace)}
+    else:
+        traces = {"zipf": zipf_trace(), "zipf+scan": scan_trace()}
+
+    print(
+        f"{'Трасса':<12}{'Размер':>8}  {'Политика':<10}{'Hit ratio':>10}{'ops/s':>12}{'Память, КБ':>12}"
+    )
+    for (name, trace), size, policy in itertools.product(
+        traces.items(), args.sizes, args.policies
+    ):
+        hit_ratio, ops, memory = replay(trace, policy, size)
+        print(
+            f"{name:<12}{size:>8}  {policy:<10}{hit_ratio:>10.3f}{ops:>12.0f}{memory / 1024:>12.1f}"
+        )
@@ -0,0 +1,381 @@
+from collections import OrderedDict
+
+# Таблица для быстрого деления всех 4-битных счётчиков пополам через bytearray.translate
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class LRUPolicy:
+    """
+    Вытеснение давно не использовавшихся записей (Least Recently Used). Сам lru_cache
+    для политики "lru" работает с OrderedDict напрямую, класс нужен для единообразия
+    с остальными политиками.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def __len__(self):
+        return len(self.data)
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            self.data.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.data[key] = entry
+
+    def pop(self, key):
+        return self.data.pop(key, None)
+
+    def evict(self):
+        return self.data.popitem(last=False)
+
+    def clear(self):
+        self.data.clear()
+
+
+class LFUPolicy:
+    """
+    Вытеснение редко используемых записей (Least Frequently Used) за O(1):
+    записи сгруппированы по частоте, внутри группы вытесняется самая старая.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = {}
+        self.freq = {}
+        self.buckets = {}
+        self.min_freq = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def _unlink(self, key):
+        freq = self.freq.pop(key)
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+        return freq
+
+    def _link(self, key, freq):
+        self.freq[key] = freq
+        self.buckets.setdefault(freq, OrderedDict())[key] = None
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is not None:
+            freq = self._unlink(key)
+            self._link(key, freq + 1)
+            if freq == self.min_freq and freq not in self.buckets:
+                self.min_freq = freq + 1
+        return entry
+
+    def put(self, key, entry):
+        self.data[key] = entry
+        self._link(key, 1)
+        self.min_freq = 1
+
+    def pop(self, key):
+        entry = self.data.pop(key, None)
+        if entry is not None:
+            self._unlink(key)
+        return entry
+
+    def evict(self):
+        if self.min_freq not in self.buckets:
+            # После удаления записей по ttl минимальная частота могла устареть
+            self.min_freq = min(self.buckets)
+        key, _ = self.buckets[self.min_freq].popitem(last=False)
+        if not self.buckets[self.min_freq]:
+            del self.buckets[self.min_freq]
+        del self.freq[key]
+        return key, self.data.pop(key)
+
+    def clear(self):
+        self.data.clear()
+        self.freq.clear()
+        self.buckets.clear()
+        self.min_freq = 0
+
+
+class _Node:
+    __slots__ = ("entry", "key", "next", "prev", "visited")
+
+    def __init__(self, key, entry):
+        self.key = key
+        self.entry = entry
+        self.visited = False
+        self.prev = None
+        self.next = None
+
+
+class SievePolicy:
+    """
+    Алгоритм SIEVE: очередь FIFO с битом обращения. При попадании запись не перемещается,
+    а только помечается, "стрелка" идёт от старых записей к новым и вытесняет первую непомеченную.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = {}
+        # head - самая новая запись, tail - самая старая, prev указывает в сторону новых
+        self.head = None
+        self.tail = None
+        self.hand = None
+
+    def __len__(self):
+        return len(self.data)
+
+    def _unlink(self, node):
+        if node.prev is not None:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+
+    def get(self, key):
+        node = self.data.get(key)
+        if node is None:
+            return None
+        node.visited = True
+        return node.entry
+
+    def put(self, key, entry):
+        node = _Node(key, entry)
+        node.next = self.head
+        if self.head is not None:
+            self.head.prev = node
+        self.head = node
+        if self.tail is None:
+            self.tail = node
+        self.data[key] = node
+
+    def pop(self, key):
+        node = self.data.pop(key, None)
+        if node is None:
+            return None
+        if self.hand is node:
+            self.hand = node.prev
+        self._unlink(node)
+        return node.entry
+
+    def evict(self):
+        node = self.hand or self.tail
+        while node.visited:
+            node.visited = False
+            node = node.prev or self.tail
+        self.hand = node.prev
+        self._unlink(node)
+        del self.data[node.key]
+        return node.key, node.entry
+
+    def clear(self):
+        self.data.clear()
+        self.head = self.tail = self.hand = None
+
+
+class ARCPolicy:
+    """
+    Adaptive Replacement Cache: два списка (встреченные один раз и повторно) и
+    их "призраки" - ключи недавно вытесненных записей, по которым адаптируется размер списков.
+    """
+
+    def __init__(self, maxsize):
+        if maxsize is None:
+            raise ValueError("Политика 'arc' требует указания maxsize")
+        self.maxsize = maxsize
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
+    def get(self, key):
+        entry = self.t1.pop(key, None)
+        if entry is not None:
+            # Повторное обращение переводит запись в список частых
+            self.t2[key] = entry
+            return entry
+        entry = self.t2.get(key)
+        if entry is not None:
+            self.t2.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        c = self.maxsize
+        if key in self.b1:
+            # Промах по недавно вытесненной записи - увеличиваем долю недавних
+            self.p = min(c, self.p + max(len(self.b2) // len(self.b1), 1))
+            del self.b1[key]
+            self.t2[key] = entry
+        elif key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            del self.b2[key]
+            self.t2[key] = entry
+        else:
+            self.t1[key] = entry
+            if len(self.t1) + len(self.b1) > c and self.b1:
+                self.b1.popitem(last=False)
+        if len(self) + len(self.b1) + len(self.b2) > 2 * c and self.b2:
+            self.b2.popitem(last=False)
+
+    def pop(self, key):
+        entry = self.t1.pop(key, None)
+        if entry is None:
+            entry = self.t2.pop(key, None)
+        return entry
+
+    def evict(self):
+        if self.t1 and (len(self.t1) > self.p or not self.t2):
+            key, entry = self.t1.popitem(last=False)
+            self.b1[key] = None
+        else:
+            key, entry = self.t2.popitem(last=False)
+            self.b2[key] = None
+        return key, entry
+
+    def clear(self):
+        self.p = 0
+        for part in (self.t1, self.t2, self.b1, self.b2):
+            part.clear()
+
+
+class FrequencySketch:
+    """Count-Min Sketch с 4-битными счётчиками и периодическим старением для оценки частоты ключей."""
+
+    SEEDS = (0x9E3779B1, 0x85EBCA77, 0xC2B2AE3D, 0x27D4EB2F)
+
+    def __init__(self, capacity):
+        width = 1
+        while width < max(capacity, 16):
+            width <<= 1
+        self.mask = width - 1
+        self.rows = [bytearray(width) for _ in self.SEEDS]
+        self.sample_size = 10 * max(capacity, 16)
+        self.additions = 0
+
+    def _indexes(self, key):
+        h = hash(key)
+        return [
+            ((h ^ seed) * 0x9E3779B97F4A7C15 >> 40) & self.mask for seed in self.SEEDS
+        ]
+
+    def increment(self, key):
+        for row, i in zip(self.rows, self._indexes(key)):
+            if row[i] < 15:
+                row[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            # Старение: делим все счётчики пополам, чтобы старая популярность забывалась
+            self.rows = [row.translate(_HALVE) for row in self.rows]
+            self.additions //= 2
+
+    def frequency(self, key):
+        return min(row[i] for row, i in zip(self.rows, self._indexes(key)))
+
+
+class TinyLFUPolicy:
+    """
+    W-TinyLFU: новые записи попадают в небольшое LRU-окно (1%), а в основную
+    сегментированную LRU-область попадают, только если встречались чаще кандидата на вытеснение.
+    """
+
+    def __init__(self, maxsize):
+        if maxsize is None:
+            raise ValueError("Политика 'tinylfu' требует указания maxsize")
+        self.maxsize = maxsize
+        self.window_size = max(1, maxsize // 100)
+        self.main_size = max(1, maxsize - self.window_size)
+        self.protected_size = max(1, self.main_size * 8 // 10)
+        self.window = OrderedDict()
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.sketch = FrequencySketch(maxsize)
+
+    def __len__(self):
+        return len(self.window) + len(self.probation) + len(self.protected)
+
+    def get(self, key):
+        self.sketch.increment(key)
+        entry = self.window.get(key)
+        if entry is not None:
+            self.window.move_to_end(key)
+            return entry
+        entry = self.protected.get(key)
+        if entry is not None:
+            self.protected.move_to_end(key)
+            return entry
+        entry = self.probation.pop(key, None)
+        if entry is not None:
+            # Повторное обращение в основной области переводит запись в защищённый сегмент
+            self.protected[key] = entry
+            if len(self.protected) > self.protected_size:
+                demoted_key, demoted = self.protected.popitem(last=False)
+                self.probation[demoted_key] = demoted
+        return entry
+
+    def put(self, key, entry):
+        self.window[key] = entry
+
+    def pop(self, key):
+        for part in (self.window, self.probation, self.protected):
+            entry = part.pop(key, None)
+            if entry is not None:
+                return entry
+        return None
+
+    def _main_victim(self):
+        part = self.probation or self.protected
+        return part, next(iter(part))
+
+    def evict(self):
+        while True:
+            main_len = len(self.probation) + len(self.protected)
+            if self.window and (len(self.window) >= self.window_size or not main_len):
+                candidate_key, candidate = self.window.popitem(last=False)
+                if main_len < self.main_size:
+                    self.probation[candidate_key] = candidate
+                    continue
+                part, victim_key = self._main_victim()
+                if self.sketch.frequency(candidate_key) > self.sketch.frequency(
+                    victim_key
+                ):
+                    victim = part.pop(victim_key)
+                    self.probation[candidate_key] = candidate
+                    return victim_key, victim
+                return candidate_key, candidate
+            part, victim_key = self._main_victim()
+            return victim_key, part.pop(victim_key)
+
+    def clear(self):
+        for part in (self.window, self.probation, self.protected):
+            part.clear()
+        self.sketch = FrequencySketch(self.maxsize)
+
+
+POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "sieve": SievePolicy,
+    "arc": ARCPolicy,
+    "tinylfu": TinyLFUPolicy,
+}
+
+
+def make_policy(policy, maxsize):
+    """Создаёт хранилище кэша с указанной политикой вытеснения."""
+    if policy not in POLICIES:
+        raise ValueError(
+            f"Неизвестная политика вытеснения '{policy}', доступны: {', '.join(POLICIES)}"
+        )
+    return POLICIES[policy](maxsize)
@@ -1,45 +1,384 @@
+import asyncio
+import inspect
+import sys
+import threading
+import time
 import unittest.mock
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from functools import wraps
 
+from eviction_policies import make_policy
 
-def lru_cache(func=None, maxsize=None):
-    """Декоратор lru_cache, с возможностью вызова с максимальной длиной кэша или без неё"""
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize", "maxbytes", "currbytes"]
+)
+
+# Разделитель между позиционными и именованными аргументами в ключе кэша,
+# чтобы вызовы f(("c", 3)) и f(c=3) не давали одинаковый ключ
+_KWARGS_MARK = object()
+# Типы, для которых единственный позиционный аргумент можно использовать как ключ без обёртки в кортеж
+_FAST_TYPES = {int, str}
+# Признак отсутствия значения в кэше: None может быть закэшированным результатом
+_MISSING = object()
+
+
+def lru_cache(
+    func=None,
+    maxsize=None,
+    *,
+    ttl=None,
+    maxbytes=None,
+    sizeof=None,
+    error_ttl=None,
+    policy="lru",
+    l2=None,
+):
+    """
+    Декоратор lru_cache, с возможностью вызова с максимальной длиной кэша или без неё.
+    При maxsize=0 результаты не кэшируются, как в functools.lru_cache.
+
+    ttl - время жизни записи в секундах, maxbytes - ограничение суммарного размера значений в байтах,
+    sizeof - функция оценки размера значения (по умолчанию sys.getsizeof),
+    error_ttl - на сколько секунд кэшировать исключения (по умолчанию не кэшируются),
+    policy - политика вытеснения: "lru", "lfu", "sieve", "arc" или "tinylfu",
+    l2 - общий для процессов кэш второго уровня (например, RedisL2), к которому обращаемся при локальном промахе.
+    Корутинные функции кэшируются по результату, одновременные вызовы с одним ключом объединяются.
+    """
+    options = {
+        "ttl": ttl,
+        "maxbytes": maxbytes,
+        "sizeof": sizeof,
+        "error_ttl": error_ttl,
+        "policy": policy,
+        "l2": l2,
+    }
     # Проверяем на возможность вызова без указания maxsize
     if func is not None and callable(func):
-        return lru_wrapper(func, maxsize)
+        return lru_wrapper(func, maxsize, **options)
 
     # Если функция дошла до сюда, значит происходит вызов с использованием maxsize
     def decorator(func):
-        return lru_wrapper(func, maxsize)
+        return lru_wrapper(func, maxsize, **options)
 
     return decorator
 
 
-def lru_wrapper(func, maxsize):
+def make_key(args, kwargs):
+    """Строит ключ кэша из аргументов вызова."""
+    if kwargs:
+        return args + (_KWARGS_MARK,) + tuple(kwargs.items())
+    if len(args) == 1 and type(args[0]) in _FAST_TYPES:
+        # Быстрый путь: один аргумент простого типа используется как ключ напрямую
+        return args[0]
+    return args
+
+
+class _CachedError:
+    """Обёртка для исключения, сохранённого в кэше на error_ttl секунд."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def fast_lru_wrapper(func, maxsize):
+    """
+    Обёртка для самого частого случая: политика "lru" без ttl, maxbytes, error_ttl и l2.
+    Значения лежат в OrderedDict как есть, без списка с метаданными, и обращение к кэшу
+    не вызывает вспомогательных функций и не захватывает блокировку: каждая операция
+    со словарём - один вызов C-кода, атомарный под GIL, как в functools.lru_cache.
+    """
     cache = OrderedDict()
+    cache_get = cache.get
+    move_to_end = cache.move_to_end
+    popitem = cache.popitem
+    # Без ограничения размера проверка ниже никогда не срабатывает
+    limit = maxsize if maxsize is not None else sys.maxsize
+    hits = misses = 0
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        key_kwargs = tuple(sorted(kwargs.items())) if kwargs else ()
-        key = args + key_kwargs
-        if key in cache:
-            # Если берем значения из кэша, передвигаем его к концу словаря
-            value = cache.pop(key)
-            cache[key] = value
-            # print("From cache", cache)
+        nonlocal hits, misses
+        # То же, что make_key, но без вызова функции на каждое обращение
+        if kwargs:
+            key = args + (_KWARGS_MARK,) + tuple(kwargs.items())
+        elif len(args) == 1 and type(args[0]) in _FAST_TYPES:
+            key = args[0]
+        else:
+            key = args
+        value = cache_get(key, _MISSING)
+        if value is not _MISSING:
+            hits += 1
+            try:
+                move_to_end(key)
+            except KeyError:
+                # Запись вытеснил другой поток между чтением и перемещением
+                pass
             return value
+
+        misses += 1
+        # Саму функцию вызываем без блокировки, чтобы не останавливать другие потоки
         value = func(*args, **kwargs)
+        if not limit:
+            # maxsize=0: кэш ничего не хранит и только считает промахи
+            return value
         cache[key] = value
-        if maxsize is not None and len(cache) > maxsize:
-            # Если кэш переполнен из начала словаря удаляем значение, которое использовалось раньше всего
-            cache.popitem(last=False)
-        # print("Not from cache", cache)
+        # Вытесняем после вставки и в цикле: если потоки вставили записи одновременно,
+        # лишние уйдут здесь же. last передаётся позиционно - так вызов дешевле
+        while len(cache) > limit:
+            try:
+                popitem(False)
+            except KeyError:
+                break
         return value
 
+    def cache_info():
+        """Возвращает статистику кэша."""
+        return CacheInfo(hits, misses, maxsize, len(cache), None, 0)
+
+    def cache_clear():
+        """Очищает кэш и сбрасывает статистику."""
+        nonlocal hits, misses
+        cache.clear()
+        hits = misses = 0
+
+    def cache_invalidate(*args, **kwargs):
+        """Удаляет из кэша результат для указанных аргументов."""
+        cache.pop(make_key(args, kwargs), None)
+
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    wrapper.cache_invalidate = cache_invalidate
     return wrapper
 
 
+def lru_wrapper(
+    func,
+    maxsize,
+    ttl=None,
+    maxbytes=None,
+    sizeof=None,
+    error_ttl=None,
+    policy="lru",
+    l2=None,
+):
+    if (
+        policy == "lru"
+        and ttl is None
+        and maxbytes is None
+        and error_ttl is None
+        and l2 is None
+        and not inspect.iscoroutinefunction(func)
+    ):
+        return fast_lru_wrapper(func, maxsize)
+    if sizeof is None:
+        sizeof = sys.getsizeof
+    # Значение в кэше - список [результат, время истечения или None, размер в байтах,
+    # хэш аргументов во втором уровне или None]
+    lru = policy == "lru"
+    if lru:
+        # Политика по умолчанию работает с OrderedDict прямо в обёртке: попадание не
+        # проходит через вызовы методов объекта политики
+        cache = OrderedDict()
+    else:
+        cache = make_policy(policy, maxsize)
+    lock = threading.RLock()
+    hits = misses = currbytes = 0
+    # Выполняющиеся задачи корутинной функции по ключу, общие для всех ожидающих
+    in_flight = {}
+    # Хэш аргументов во втором уровне -> локальный ключ: инвалидации из других процессов
+    # приходят с хэшем, а не с самими аргументами
+    l2_keys = {}
+
+    def forget(entry):
+        nonlocal currbytes
+        currbytes -= entry[2]
+        if entry[3] is not None:
+            l2_keys.pop(entry[3], None)
+
+    def evict(size):
+        nonlocal currbytes
+        # Освобождаем место под новую запись размера size, жертву выбирает политика вытеснения
+        while len(cache) and (
+            (maxsize is not None and len(cache) >= maxsize)
+            or (maxbytes is not None and currbytes + size > maxbytes)
+        ):
+            _, entry = cache.popitem(last=False) if lru else cache.evict()
+            forget(entry)
+
+    def discard(key):
+        # У OrderedDict pop без значения по умолчанию бросает KeyError
+        return cache.pop(key, None) if lru else cache.pop(key)
+
+    def lookup(key):
+        """Возвращает запись из кэша или None, учитывая попадание или промах в статистике."""
+        nonlocal hits, misses
+        with lock:
+            entry = cache.get(key)
+            if entry is not None:
+                if entry[1] is None or entry[1] > time.monotonic():
+                    if lru:
+                        cache.move_to_end(key)
+                    hits += 1
+                    return entry
+                # Срок жизни записи истёк
+                discard(key)
+                forget(entry)
+            misses += 1
+            return None
+
+    def store(key, value, entry_ttl, digest=None):
+        nonlocal currbytes
+        if maxsize == 0:
+            # Как и в быстрой обёртке: при maxsize=0 ничего не кэшируем
+            return
+        size = sizeof(value) if maxbytes is not None else 0
+        if maxbytes is not None and size > maxbytes:
+            # Значение больше всего бюджета кэша - не кэшируем его
+            return
+        expires_at = time.monotonic() + entry_ttl if entry_ttl is not None else None
+        with lock:
+            old = discard(key)
+            if old is not None:
+                forget(old)
+            evict(size)
+            if lru:
+                cache[key] = [value, expires_at, size, digest]
+            else:
+                cache.put(key, [value, expires_at, size, digest])
+            currbytes += size
+            if digest is not None:
+                l2_keys[digest] = key
+
+    def drop(key):
+        nonlocal currbytes
+        with lock:
+            entry = discard(key)
+            if entry is not None:
+                forget(entry)
+
+    def drop_all():
+        nonlocal currbytes
+        with lock:
+            cache.clear()
+            l2_keys.clear()
+            currbytes = 0
+
+    def unwrap(value):
+        if type(value) is _CachedError:
+            raise value.error
+        return value
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = make_key(args, kwargs)
+        entry = lookup(key)
+        if entry is not None:
+            return unwrap(entry[0])
+
+        # Без хэша аргументов (их не удалось сериализовать) вызов обходит второй уровень
+        digest = None if l2 is None else l2.digest(args, kwargs)
+        if digest is not None:
+            found, value = l2.get(namespace, digest)
+            if found:
+                store(key, value, ttl, digest)
+                return value
+
+        # Саму функцию вызываем без блокировки, чтобы не останавливать другие потоки
+        try:
+            value = func(*args, **kwargs)
+        except Exception as e:
+            if error_ttl is not None:
+                store(key, _CachedError(e), error_ttl, digest)
+            raise
+        store(key, value, ttl, digest)
+        if digest is not None:
+            l2.set(namespace, digest, value)
+        return value
+
+    async def load(args, kwargs, digest):
+        # Клиент Redis синхронный, поэтому обращения к нему выносим в отдельный поток
+        found, value = await asyncio.to_thread(l2.get, namespace, digest)
+        if found:
+            return value
+        value = await func(*args, **kwargs)
+        await asyncio.to_thread(l2.set, namespace, digest, value)
+        return value
+
+    @wraps(func)
+    async def async_wrapper(*args, **kwargs):
+        key = make_key(args, kwargs)
+        entry = lookup(key)
+        if entry is not None:
+            return unwrap(entry[0])
+
+        task = in_flight.get(key)
+        if task is None:
+            # Первый вызов с этим ключом запускает задачу, остальные ждут её результат
+            digest = None if l2 is None else l2.digest(args, kwargs)
+            if digest is None:
+                coro = func(*args, **kwargs)
+            else:
+                coro = load(args, kwargs, digest)
+            task = asyncio.ensure_future(coro)
+            in_flight[key] = task
+            task.add_done_callback(lambda t: finish(key, digest, t))
+        # shield не даёт отмене одного ожидающего отменить общий вызов для остальных
+        return await asyncio.shield(task)
+
+    def finish(key, digest, task):
+        in_flight.pop(key, None)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is None:
+            store(key, task.result(), ttl, digest)
+        elif error_ttl is not None:
+            store(key, _CachedError(error), error_ttl, digest)
+
+    def cache_info():
+        """Возвращает статистику кэша."""
+        with lock:
+            return CacheInfo(hits, misses, maxsize, len(cache), maxbytes, currbytes)
+
+    def cache_clear():
+        """Очищает кэш и сбрасывает статистику, в том числе во втором уровне и в других процессах."""
+        nonlocal hits, misses
+        with lock:
+            drop_all()
+            hits = misses = 0
+        if l2 is not None:
+            l2.clear(namespace)
+
+    def cache_invalidate(*args, **kwargs):
+        """Удаляет из кэша результат для указанных аргументов, в том числе в других процессах."""
+        drop(make_key(args, kwargs))
+        digest = None if l2 is None else l2.digest(args, kwargs)
+        if digest is not None:
+            l2.invalidate(namespace, digest)
+
+    def on_invalidate(digest):
+        # Инвалидация, пришедшая из другого процесса
+        if digest is None:
+            drop_all()
+            return
+        with lock:
+            key = l2_keys.get(digest)
+            if key is not None:
+                drop(key)
+
+    if l2 is not None:
+        namespace = l2.namespace(func)
+        l2.subscribe(namespace, on_invalidate)
+
+    result = async_wrapper if inspect.iscoroutinefunction(func) else wrapper
+    result.cache_info = cache_info
+    result.cache_clear = cache_clear
+    result.cache_invalidate = cache_invalidate
+    return result
+
+
 @lru_cache
 def sum(a: int, b: int) -> int:
     return a + b
@@ -79,3 +418,129 @@ if __name__ == "__main__":
     assert decorated(5, 6) == 3
     assert decorated(1, 2) == 4
     assert mocked_func.call_count == 4
+    assert decorated.cache_info().hits == 3
+    assert decorated.cache_info().misses == 4
+    assert decorated.cache_info().currsize == 2
+
+    decorated.cache_clear()
+    assert decorated.cache_info() == (0, 0, 2, 0, None, 0)
+
+    # Позиционный кортеж и именованный аргумент не должны давать одинаковый ключ
+    mocked_func = unittest.mock.Mock(side_effect=[1, 2])
+    decorated = lru_cache(mocked_func)
+    assert decorated(("c", 3)) == 1
+    assert decorated(c=3) == 2
+
+    decorated.cache_invalidate(c=3)
+    assert decorated.cache_info().currsize == 1
+
+    # Закэшированный None - это попадание, а не промах
+    mocked_func = unittest.mock.Mock(return_value=None)
+    decorated = lru_cache(maxsize=2)(mocked_func)
+    assert decorated(1) is None
+    assert decorated(1) is None
+    assert mocked_func.call_count == 1
+    decorated(2)
+    decorated(3)
+    assert decorated.cache_info() == (1, 3, 2, 2, None, 0)
+
+    # Проверка ttl
+    mocked_func = unittest.mock.Mock(side_effect=[1, 2])
+    decorated = lru_cache(ttl=0.05)(mocked_func)
+    assert decorated(1) == 1
+    assert decorated(1) == 1
+    time.sleep(0.1)
+    assert decorated(1) == 2
+
+    # Проверка ограничения по размеру значений
+    decorated = lru_cache(maxbytes=100, sizeof=len)(lambda n: "x" * n)
+    decorated(30)
+    decorated(40)
+    decorated(50)
+    assert decorated.cache_info().currsize == 2
+    assert decorated.cache_info().currbytes == 90
+    decorated(200)
+    assert decorated.cache_info().currsize == 2
+
+    # Проверка работы из нескольких потоков
+    counter = lru_cache(maxsize=10)(lambda n: n * 2)
+    threads = [
+        threading.Thread(target=lambda: [counter(i % 20) for i in range(1000)])
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    info = counter.cache_info()
+    assert info.hits + info.misses == 8000
+    assert info.currsize == 10
+
+    # Проверка корутинной функции: кэшируется результат, одновременные вызовы объединяются
+    calls = 0
+
+    @lru_cache(maxsize=10)
+    async def fetch(n):
+        global calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if n < 0:
+            raise ValueError(n)
+        return n * 10
+
+    async def check_async():
+        results = await asyncio.gather(*(fetch(1) for _ in range(50)))
+        assert results == [10] * 50
+        assert calls == 1
+        assert await fetch(1) == 10
+        assert calls == 1
+
+        # Ошибки по умолчанию не кэшируются
+        for _ in range(2):
+            try:
+                await fetch(-1)
+            except ValueError:
+                pass
+        assert calls == 3
+
+    asyncio.run(check_async())
+
+    # Кэширование ошибок на error_ttl секунд
+    mocked_func = unittest.mock.Mock(side_effect=[KeyError("a"), 1])
+    decorated = lru_cache(error_ttl=0.05)(mocked_func)
+    for _ in range(2):
+        try:
+            decorated("a")
+        except KeyError:
+            pass
+    assert mocked_func.call_count == 1
+    time.sleep(0.1)
+    assert decorated("a") == 1
+
+    # Все политики вытеснения работают через один и тот же декоратор
+    for name in ("lru", "lfu", "sieve", "arc", "tinylfu"):
+        mocked_func = unittest.mock.Mock(side_effect=lambda n: n * 2)
+        decorated = lru_cache(maxsize=3, policy=name)(mocked_func)
+        for n in (1, 2, 1, 3, 1, 4, 5, 1, 6, 1):
+            assert decorated(n) == n * 2
+        info = decorated.cache_info()
+        assert info.currsize <= 3
+        assert info.hits + info.misses == 10
+        assert info.misses == mocked_func.call_count
+        if name != "tinylfu":
+            # Часто используемый ключ 1 должен пережить поток одноразовых ключей
+            assert info.hits >= 3, (name, info)
+
+    # maxsize=0 ничего не хранит ни в быстрой обёртке, ни в общей
+    for options in (
+        {},
+        {"ttl": 60},
+        *({"policy": name} for name in ("lfu", "sieve", "arc", "tinylfu")),
+    ):
+        mocked_func = unittest.mock.Mock(side_effect=lambda n: n * 2)
+        decorated = lru_cache(maxsize=0, **options)(mocked_func)
+        for n in (1, 1, 2):
+            assert decorated(n) == n * 2
+        info = decorated.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (0, 3, 0), (options, info)
+        assert mocked_func.call_count == 3
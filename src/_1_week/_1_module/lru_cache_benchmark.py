@@ -0,0 +1,86 @@
+import functools
+import random
+import timeit
+from collections import OrderedDict
+
+from lru_cache import lru_cache
+
+CALLS = 200000
+KEYS = 2000
+MAXSIZE = 1000
+REPEAT = 5
+
+
+def target(a, b=0):
+    return a + b
+
+
+def baseline_lru_cache(maxsize):
+    """Исходная реализация lru_cache (pop и повторная вставка в OrderedDict) для сравнения."""
+
+    def decorator(func):
+        cache = OrderedDict()
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key_kwargs = tuple(sorted(kwargs.items())) if kwargs else ()
+            key = args + key_kwargs
+            if key in cache:
+                value = cache.pop(key)
+                cache[key] = value
+                return value
+            value = func(*args, **kwargs)
+            cache[key] = value
+            if maxsize is not None and len(cache) > maxsize:
+                cache.popitem(last=False)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_info = lambda: functools._CacheInfo(0, 0, maxsize, len(cache))
+        return wrapper
+
+    return decorator
+
+
+def run(name, func, calls):
+    """Прогоняет calls вызовов func и печатает лучшее время на вызов и статистику кэша."""
+    best = min(
+        timeit.repeat(
+            lambda: [func(*c) for c in calls],
+            setup=func.cache_clear,
+            number=1,
+            repeat=REPEAT,
+        )
+    )
+    info = func.cache_info()
+    stats = f"hits={info.hits} misses={info.misses}" if info.hits or info.misses else ""
+    print(f"{name:<45} {best / len(calls) * 1e9:8.1f} нс/вызов  {stats}")
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    one_arg = [(random.randrange(KEYS),) for _ in range(CALLS)]
+    two_args = [(random.randrange(KEYS), random.randrange(3)) for _ in range(CALLS)]
+    # Ключей меньше maxsize: после прогрева все вызовы - попадания
+    hits_only = [(random.randrange(MAXSIZE // 2),) for _ in range(CALLS)]
+
+    for title, calls in (
+        ("Только попадания", hits_only),
+        ("Один аргумент", one_arg),
+        ("Два аргумента", two_args),
+    ):
+        print(f"\n{title}, {CALLS} вызовов, {KEYS} ключей, maxsize={MAXSIZE}")
+        run("functools.lru_cache", functools.lru_cache(MAXSIZE)(target), calls)
+        run("исходный lru_cache", baseline_lru_cache(MAXSIZE)(target), calls)
+        run("lru_cache", lru_cache(maxsize=MAXSIZE)(target), calls)
+        run(
+            "lru_cache policy=lfu",
+            lru_cache(maxsize=MAXSIZE, policy="lfu")(target),
+            calls,
+        )
+        run("lru_cache ttl=60", lru_cache(maxsize=MAXSIZE, ttl=60)(target), calls)
+        run(
+            "lru_cache maxbytes=1MB",
+            lru_cache(maxsize=MAXSIZE, maxbytes=1024 * 1024)(target),
+            calls,
+        )
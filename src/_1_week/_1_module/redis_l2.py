@@ -0,0 +1,227 @@
+import hashlib
+import json
+import pickle
+import time
+from uuid import uuid4
+
+import redis
+
+
+class RedisL2:
+    """
+    Второй уровень для lru_cache: общий для всех процессов кэш в Redis.
+    Инвалидации рассылаются через pub/sub, чтобы остальные процессы удаляли записи из локального кэша.
+    Сообщение инвалидации - JSON с хэшем аргументов, а не сами аргументы: данные из канала
+    может опубликовать любой клиент Redis, поэтому они никогда не распаковываются через pickle.
+    Значения записей читаются через serializer, по умолчанию pickle: записать в Redis
+    подделанное значение - значит выполнить код в процессах кэша, поэтому с pickle доступ
+    к этому Redis должен быть только у доверенных клиентов. Иначе передайте serializer=json.
+    """
+
+    def __init__(
+        self,
+        name: str = "lru_cache",
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        ttl: float | None = None,
+        serializer=pickle,
+        client: redis.Redis | None = None,
+    ):
+        self.name = name
+        self.ttl = ttl
+        # Сериализатор - любой объект с методами dumps/loads, например pickle или json
+        self.serializer = serializer
+        self.redis_client = client or redis.Redis(host=host, port=port, db=db)
+        self.channel = f"{name}:invalidate"
+        # Идентификатор процесса, чтобы не обрабатывать собственные сообщения об инвалидации
+        self.origin = uuid4().hex
+        self.handlers = {}
+        self.pubsub_thread = None
+
+    def namespace(self, func) -> str:
+        """Пространство имён ключей для отдельной функции."""
+        return f"{self.name}:{func.__module__}.{func.__qualname__}"
+
+    @staticmethod
+    def digest(args: tuple, kwargs: dict) -> str | None:
+        """
+        Хэш аргументов вызова: часть ключа в Redis и идентификатор записи в инвалидациях.
+        None, если аргументы не сериализуются (блокировки, лямбды, сокеты): такие вызовы
+        кэшируются только локально.
+        """
+        try:
+            data = pickle.dumps((args, sorted(kwargs.items())), protocol=4)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return hashlib.sha1(data).hexdigest()
+
+    def get(self, namespace: str, digest: str) -> tuple[bool, object]:
+        """Возвращает (True, значение) при попадании и (False, None) при промахе или ошибке Redis."""
+        try:
+            data = self.redis_client.get(f"{namespace}:{digest}")
+            if data is None:
+                return False, None
+            return True, self.serializer.loads(data)
+        except Exception as e:
+            print(f"Ошибка чтения из Redis: {e}")
+            return False, None
+
+    def set(self, namespace: str, digest: str, value) -> bool:
+        try:
+            data = self.serializer.dumps(value)
+            ttl_ms = int(self.ttl * 1000) if self.ttl is not None else None
+            return bool(self.redis_client.set(f"{namespace}:{digest}", data, px=ttl_ms))
+        except Exception as e:
+            print(f"Ошибка записи в Redis: {e}")
+            return False
+
+    def invalidate(self, namespace: str, digest: str) -> None:
+        """Удаляет запись из Redis и оповещает все процессы."""
+        try:
+            self.redis_client.delete(f"{namespace}:{digest}")
+            self.publish(namespace, digest)
+        except Exception as e:
+            print(f"Ошибка инвалидации в Redis: {e}")
+
+    def clear(self, namespace: str) -> None:
+        """Удаляет все записи функции из Redis и оповещает все процессы."""
+        try:
+            keys = list(self.redis_client.scan_iter(match=f"{namespace}:*"))
+            if keys:
+                self.redis_client.delete(*keys)
+            self.publish(namespace, None)
+        except Exception as e:
+            print(f"Ошибка очистки Redis: {e}")
+
+    def publish(self, namespace: str, digest: str | None) -> None:
+        message = {"origin": self.origin, "namespace": namespace, "digest": digest}
+        self.redis_client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self, namespace: str, handler) -> None:
+        """
+        Регистрирует обработчик инвалидаций handler(digest) для пространства имён.
+        При очистке всего пространства имён digest равен None.
+        """
+        self.handlers[namespace] = handler
+        if self.pubsub_thread is not None:
+            return
+        try:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self.on_message})
+            self.pubsub_thread = pubsub.run_in_thread(sleep_time=0.1, daemon=True)
+        except Exception as e:
+            print(f"Ошибка подписки на канал '{self.channel}': {e}")
+
+    def on_message(self, message) -> None:
+        try:
+            data = json.loads(message["data"])
+            origin, namespace, digest = (
+                data["origin"],
+                data["namespace"],
+                data["digest"],
+            )
+            if not isinstance(digest, (str, type(None))):
+                raise TypeError(f"digest должен быть строкой, а не {type(digest)}")
+        except Exception as e:
+            print(f"Некорректное сообщение инвалидации: {e}")
+            return
+        if origin == self.origin:
+            return
+        handler = self.handlers.get(namespace)
+        if handler is not None:
+            handler(digest)
+
+    def close(self) -> None:
+        if self.pubsub_thread is not None:
+            self.pubsub_thread.stop()
+            self.pubsub_thread = None
+
+
+if __name__ == "__main__":
+    import threading
+
+    from lru_cache import lru_cache
+
+    try:
+        import fakeredis
+    except ImportError:
+        fakeredis = None
+
+    def make_client():
+        # Без fakeredis проверка идёт на локальном Redis
+        if fakeredis is None:
+            return redis.Redis()
+        return fakeredis.FakeRedis(server=server)
+
+    def wait_until(condition, timeout: float = 5.0) -> None:
+        # Сообщения pub/sub обрабатываются в потоке подписки, поэтому ждём, а не спим
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "инвалидация не дошла"
+            time.sleep(0.01)
+
+    server = fakeredis.FakeServer() if fakeredis is not None else None
+    # Уникальное имя: записи прошлых запусков в настоящем Redis не мешают проверке
+    name = f"lru_cache_check_{uuid4().hex}"
+    calls = []
+
+    def slow_square(n: int) -> int:
+        calls.append(n)
+        return n * n
+
+    # Два кэша с разными подключениями имитируют два рабочих процесса
+    first_l2 = RedisL2(name, ttl=60, client=make_client())
+    second_l2 = RedisL2(name, ttl=60, client=make_client())
+    first = lru_cache(maxsize=100, l2=first_l2)(slow_square)
+    second = lru_cache(maxsize=100, l2=second_l2)(slow_square)
+
+    assert first(12) == 144
+    # Второй "процесс" получает значение из Redis без повторного вычисления
+    assert second(12) == 144
+    assert second(13) == 169
+    assert calls == [12, 13]
+    assert second.cache_info().currsize == 2
+
+    # Инвалидация в одном процессе удаляет запись из Redis и из локального кэша другого
+    first.cache_invalidate(12)
+    wait_until(lambda: second.cache_info().currsize == 1)
+    assert first_l2.get(first_l2.namespace(slow_square), RedisL2.digest((12,), {})) == (
+        False,
+        None,
+    )
+    assert second(12) == 144
+    assert calls == [12, 13, 12]
+
+    # Очистка в одном процессе очищает локальный кэш другого
+    first.cache_clear()
+    wait_until(lambda: second.cache_info().currsize == 0)
+
+    # Сообщения не в формате JSON (в том числе pickle) игнорируются без распаковки
+    second(14)
+    second_l2.redis_client.publish(
+        second_l2.channel, pickle.dumps(("other", first_l2.namespace(slow_square)))
+    )
+    second_l2.on_message({"data": pickle.dumps(("other", "ns", None, None))})
+    second_l2.on_message({"data": json.dumps({"origin": "other", "digest": 1})})
+    assert second.cache_info().currsize == 1
+
+    # Аргументы, которые не сериализуются через pickle, кэшируются только локально
+    lock = threading.Lock()
+    described = []
+
+    def describe(key, value) -> str:
+        described.append(value)
+        return type(key).__name__
+
+    local_only = lru_cache(maxsize=100, l2=first_l2)(describe)
+    for value in (lambda: None, 1):
+        assert RedisL2.digest((lock, value), {}) is None
+        assert local_only(lock, value) == "lock"
+        assert local_only(lock, value) == "lock"
+    assert len(described) == 2
+    local_only.cache_invalidate(lock, 1)
+    assert local_only.cache_info().currsize == 1
+
+    first_l2.close()
+    second_l2.close()
@@ -0,0 +1,31 @@
+import random
+import time
+
+from search_element_in_array import search, search_many
+
+SIZES = [10**3, 10**5, 10**6]
+NEEDLES = 10**5
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    print(
+        f"{'Размер':>10} {'Иглы':>8}  {'search в цикле':>15} {'search_many':>12} {'отсорт.':>10}"
+    )
+    for size in SIZES:
+        array = sorted(random.sample(range(size * 2), size))
+        needles = [random.randrange(size * 2) for _ in range(NEEDLES)]
+        sorted_needles = sorted(needles)
+
+        loop = timed(lambda: [search(array, needle) for needle in needles])
+        batch = timed(lambda: search_many(array, needles))
+        merged = timed(lambda: search_many(array, sorted_needles))
+        print(
+            f"{size:>10} {NEEDLES:>8}  {loop:>14.3f}с {batch:>11.3f}с {merged:>9.3f}с"
+        )
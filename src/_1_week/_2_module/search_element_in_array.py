@@ -1,3 +1,8 @@
+from bisect import bisect_left, bisect_right
+from functools import partial
+from itertools import pairwise
+
+
 def search(array: list[int], number: int) -> bool:
     small = 0
     big = len(array) - 1
@@ -13,9 +18,87 @@ def search(array: list[int], number: int) -> bool:
     return False
 
 
+def lower_bound(array: list[int], number: int) -> int:
+    """Индекс первого элемента, не меньшего number (len(array), если такого нет)."""
+    return bisect_left(array, number)
+
+
+def upper_bound(array: list[int], number: int) -> int:
+    """Индекс первого элемента, большего number (len(array), если такого нет)."""
+    return bisect_right(array, number)
+
+
+def count_range(array: list[int], low: int, high: int) -> int:
+    """Количество элементов в отрезке [low, high]."""
+    if low > high:
+        return 0
+    return bisect_right(array, high) - bisect_left(array, low)
+
+
+def _merge_lower_bounds(array: list[int], needles: list[int]) -> list[int]:
+    """lower_bound для отсортированных needles одним совместным проходом по обоим массивам."""
+    result = []
+    i = 0
+    n = len(array)
+    for needle in needles:
+        while i < n and array[i] < needle:
+            i += 1
+        result.append(i)
+    return result
+
+
+def _lower_bounds(array: list[int], needles: list[int]) -> list[int]:
+    if all(a <= b for a, b in pairwise(needles)):
+        # Слияние выгодно, когда needles плотно покрывают массив: O(n + m) вместо O(m log n)
+        if len(needles) * max(len(array), 1).bit_length() >= len(array):
+            return _merge_lower_bounds(array, needles)
+        # Иначе ищем двоичным поиском, начиная с позиции предыдущей иглы
+        result = []
+        lo = 0
+        for needle in needles:
+            lo = bisect_left(array, needle, lo)
+            result.append(lo)
+        return result
+    # Неотсортированные needles: двоичный поиск для каждой иглы целиком на уровне C через map
+    return list(map(partial(bisect_left, array), needles))
+
+
+def search_many(array: list[int], needles: list[int]) -> list[bool]:
+    """Проверяет наличие каждого из needles в отсортированном array, возвращает маску."""
+    n = len(array)
+    return [
+        i < n and array[i] == needle
+        for i, needle in zip(_lower_bounds(array, needles), needles)
+    ]
+
+
+def search_positions(array: list[int], needles: list[int]) -> list[int]:
+    """Для каждого из needles возвращает индекс его первого вхождения в array или -1."""
+    n = len(array)
+    return [
+        i if i < n and array[i] == needle else -1
+        for i, needle in zip(_lower_bounds(array, needles), needles)
+    ]
+
+
 if __name__ == "__main__":
     res1 = search([1, 2, 3, 4, 5, 6, 7, 8, 9], 5)
     print(res1)
 
     res2 = search([1, 2, 3, 4, 5, 6, 7, 8, 9], 10)
     print(res2)
+
+    array = [1, 3, 3, 5, 7, 9]
+    assert search_many(array, [0, 1, 3, 4, 9, 10]) == [
+        False,
+        True,
+        True,
+        False,
+        True,
+        False,
+    ]
+    assert search_many(array, [9, 0, 5, 4]) == [True, False, True, False]
+    assert search_positions(array, [3, 7, 8]) == [1, 4, -1]
+    assert lower_bound(array, 3) == 1
+    assert upper_bound(array, 3) == 3
+    assert count_range(array, 2, 7) == 4
@@ -0,0 +1,214 @@
+import mmap
+import struct
+from array import array
+
+MAGIC = b"EYTZINGR"
+# Заголовок файла: сигнатура и количество ключей, далее ключи int64 в порядке Эйтцингера
+HEADER = struct.Struct("<8sQ")
+TYPECODE = "q"
+
+
+def _first_node(n: int) -> int:
+    """Самый левый (минимальный) узел неявного дерева из n узлов, 0 для пустого дерева."""
+    if n == 0:
+        return 0
+    k = 1
+    while 2 * k <= n:
+        k *= 2
+    return k
+
+
+def _next_node(k: int, n: int) -> int:
+    """Следующий по возрастанию узел после k (центрированный обход), 0 если k последний."""
+    if 2 * k + 1 <= n:
+        # Есть правое поддерево - идём в его самый левый узел
+        k = 2 * k + 1
+        while 2 * k <= n:
+            k *= 2
+        return k
+    # Поднимаемся, пока узел является правым потомком, затем ещё на один уровень
+    while k & 1:
+        k >>= 1
+    return k >> 1
+
+
+def _subtree_size(k: int, n: int) -> int:
+    """Количество узлов в поддереве с корнем k."""
+    size = 0
+    width = 1
+    while k <= n:
+        size += min(width, n - k + 1)
+        k <<= 1
+        width <<= 1
+    return size
+
+
+def _fill(keys, view, n: int) -> None:
+    """Раскладывает отсортированные ключи по узлам в порядке центрированного обхода."""
+    k = _first_node(n)
+    previous = None
+    count = 0
+    for key in keys:
+        if k == 0:
+            raise ValueError(f"Ключей больше, чем указано: {n}")
+        if previous is not None and key < previous:
+            raise ValueError("Ключи должны быть отсортированы по возрастанию")
+        view[k] = key
+        previous = key
+        count += 1
+        k = _next_node(k, n)
+    if count != n:
+        raise ValueError(f"Ожидалось {n} ключей, получено {count}")
+
+
+class SortedIndex:
+    """
+    Неизменяемый индекс по отсортированным целым числам. Ключи хранятся в компактном массиве int64
+    в раскладке Эйтцингера (дерево в ширину, узел k имеет потомков 2k и 2k + 1): первые уровни
+    поиска лежат рядом в памяти, поэтому доступ к ним дружелюбнее к кэшу процессора, чем двоичный поиск.
+    Индекс можно сохранить в файл и открыть через mmap без чтения всего файла в память.
+    """
+
+    def __init__(self, keys, n: int, mapping: mmap.mmap | None = None):
+        # keys - массив или memoryview из n + 1 элементов, нулевой элемент не используется
+        self.keys = keys
+        self.n = n
+        self.mapping = mapping
+
+    @classmethod
+    def build(cls, sorted_keys) -> "SortedIndex":
+        """Строит индекс в памяти из отсортированной последовательности."""
+        sorted_keys = list(sorted_keys)
+        n = len(sorted_keys)
+        keys = array(TYPECODE, bytes((n + 1) * 8))
+        _fill(sorted_keys, keys, n)
+        return cls(keys, n)
+
+    @classmethod
+    def build_file(cls, path: str, sorted_keys, n: int) -> "SortedIndex":
+        """
+        Строит индекс сразу в файле из итератора на n отсортированных ключей,
+        не держа ключи в памяти целиком, и открывает его через mmap.
+        """
+        size = HEADER.size + (n + 1) * 8
+        with open(path, "w+b") as f:
+            f.truncate(size)
+            with mmap.mmap(f.fileno(), size) as mapping:
+                mapping[: HEADER.size] = HEADER.pack(MAGIC, n)
+                view = memoryview(mapping)[HEADER.size :].cast(TYPECODE)
+                try:
+                    _fill(sorted_keys, view, n)
+                finally:
+                    view.release()
+                mapping.flush()
+        return cls.open(path)
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.n))
+            f.write(memoryview(self.keys).cast("B"))
+
+    @classmethod
+    def open(cls, path: str) -> "SortedIndex":
+        """Открывает сохранённый индекс через mmap: страницы читаются с диска по мере обращения."""
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n = HEADER.unpack(mapping[: HEADER.size])
+        if magic != MAGIC or len(mapping) != HEADER.size + (n + 1) * 8:
+            mapping.close()
+            raise ValueError(f"Файл '{path}' не является индексом SortedIndex")
+        keys = memoryview(mapping)[HEADER.size :].cast(TYPECODE)
+        return cls(keys, n, mapping)
+
+    def close(self) -> None:
+        if self.mapping is not None:
+            self.keys.release()
+            self.mapping.close()
+            self.mapping = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __contains__(self, key: int) -> bool:
+        return self.contains(key)
+
+    def __iter__(self):
+        k = _first_node(self.n)
+        while k != 0:
+            yield self.keys[k]
+            k = _next_node(k, self.n)
+
+    def _lower_bound_node(self, key: int) -> int:
+        """Узел с наименьшим ключом, не меньшим key, или 0, если все ключи меньше key."""
+        keys = self.keys
+        n = self.n
+        k = 1
+        while k <= n:
+            # Без ветвлений: направление спуска задаётся результатом сравнения
+            k = 2 * k + (keys[k] < key)
+        # Отбрасываем последние шаги вправо и ещё один шаг влево
+        return k >> ((~k) & (k + 1)).bit_length()
+
+    def contains(self, key: int) -> bool:
+        k = self._lower_bound_node(key)
+        return k != 0 and self.keys[k] == key
+
+    def rank(self, key: int) -> int:
+        """Количество ключей, меньших key."""
+        keys = self.keys
+        n = self.n
+        rank = 0
+        k = 1
+        while k <= n:
+            if keys[k] < key:
+                rank += _subtree_size(2 * k, n) + 1
+                k = 2 * k + 1
+            else:
+                k = 2 * k
+        return rank
+
+    def count_range(self, low: int, high: int) -> int:
+        """Количество ключей в отрезке [low, high]."""
+        if low > high:
+            return 0
+        return self.rank(high + 1) - self.rank(low)
+
+    def range(self, low: int, high: int | None):
+        """Перебирает по возрастанию ключи из отрезка [low, high] (high=None - до конца)."""
+        keys = self.keys
+        n = self.n
+        k = self._lower_bound_node(low)
+        while k != 0 and (high is None or keys[k] <= high):
+            yield keys[k]
+            k = _next_node(k, n)
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+
+    data = [1, 3, 3, 5, 7, 9, 11, 15, 20, 21]
+    index = SortedIndex.build(data)
+    assert [x for x in range(25) if x in index] == sorted(set(data))
+    assert [index.rank(x) for x in (0, 1, 3, 4, 21, 22)] == [0, 0, 1, 3, 9, 10]
+    assert index.count_range(3, 11) == 6
+    assert list(index.range(4, 20)) == [5, 7, 9, 11, 15, 20]
+    assert list(index) == data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.bin")
+        index.save(path)
+        with SortedIndex.open(path) as opened:
+            assert list(opened) == data
+            assert opened.contains(15) and not opened.contains(16)
+
+        with SortedIndex.build_file(path, range(0, 2000, 2), 1000) as built:
+            assert len(built) == 1000
+            assert built.contains(1998) and not built.contains(1999)
+            assert built.rank(1000) == 500
@@ -0,0 +1,61 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from search_element_in_array import search
+from sorted_index import SortedIndex
+
+SIZES = [10**3, 10**4, 10**5, 10**6, 10**7]
+QUERIES = 10**5
+# Больше этого размера обычный список не строим: 10^9 чисел int в списке займут десятки ГБ
+LIST_LIMIT = 10**7
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SortedIndex против search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--queries", type=int, default=QUERIES)
+    args = parser.parse_args()
+
+    random.seed(0)
+    print(
+        f"{'Размер':>12} {'Построение':>11} {'Открытие':>10} "
+        f"{'SortedIndex':>12} {'search':>10}  (время на запрос)"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.bin")
+        for size in args.sizes:
+            # Чётные числа: половина запросов попадает в индекс, половина нет
+            build_time, index = timed(
+                lambda: SortedIndex.build_file(path, range(0, 2 * size, 2), size)
+            )
+            index.close()
+            open_time, index = timed(lambda: SortedIndex.open(path))
+            queries = [random.randrange(2 * size) for _ in range(args.queries)]
+
+            index_time, found = timed(lambda: [index.contains(q) for q in queries])
+            index.close()
+
+            if size <= LIST_LIMIT:
+                array = list(range(0, 2 * size, 2))
+                search_time, expected = timed(
+                    lambda: [search(array, q) for q in queries]
+                )
+                assert found == expected
+                del array
+                search_cell = f"{search_time / args.queries * 1e6:>8.2f}мкс"
+            else:
+                search_cell = f"{'-':>11}"
+
+            print(
+                f"{size:>12} {build_time:>10.2f}с {open_time * 1e3:>8.2f}мс "
+                f"{index_time / args.queries * 1e6:>9.2f}мкс {search_cell}"
+            )
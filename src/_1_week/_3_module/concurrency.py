@@ -0,0 +1,212 @@
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+import aiohttp
+
+GLOBAL_LIMIT = 100  # Общий предел одновременных запросов
+INITIAL_HOST_LIMIT = 5  # Начальный предел для нового хоста
+MIN_HOST_LIMIT = 1
+MAX_HOST_LIMIT = 50
+MAX_TRACKED_HOSTS = 10000  # Для скольких последних хостов хранится состояние
+LATENCY_TARGET_SECONDS = 2.0  # Запрос дольше этого считается признаком перегрузки хоста
+DECREASE_FACTOR = 0.5  # Во сколько раз уменьшается предел при перегрузке
+EWMA_ALPHA = 0.2  # Вес нового наблюдения в скользящих средних
+DNS_CACHE_TTL = 300
+KEEPALIVE_TIMEOUT = 30
+
+
+class Slot:
+    """Разрешение на один запрос; failed отмечает ошибку или признак перегрузки хоста."""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+@asynccontextmanager
+async def semaphore_slot(semaphore: asyncio.Semaphore):
+    """Обычный семафор с тем же интерфейсом, что и ConcurrencyController.slot."""
+    async with semaphore:
+        yield Slot()
+
+
+@asynccontextmanager
+async def try_semaphore_slot(semaphore: asyncio.Semaphore):
+    """Как semaphore_slot, но не ждёт: если свободного места нет, отдаёт None."""
+    if semaphore.locked():
+        yield None
+        return
+    async with semaphore:
+        yield Slot()
+
+
+class HostState:
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.latency = None
+        self.error_rate = 0.0
+        self.last_decrease = 0.0
+
+
+class ConcurrencyController:
+    """
+    Адаптивное ограничение параллельности по хостам (AIMD): после каждого успешного быстрого
+    ответа предел хоста растёт на 1 / предел (примерно +1 за "окно" запросов), при ошибке
+    или задержке выше latency_target уменьшается в 1 / decrease_factor раз, но не чаще раза за
+    среднюю задержку хоста. Сверху действует общий предел global_limit на все хосты.
+    Хранится состояние не больше чем max_hosts хостов: сверх этого вытесняются давно не
+    использованные хосты без запросов в работе.
+    """
+
+    def __init__(
+        self,
+        global_limit: int = GLOBAL_LIMIT,
+        initial_limit: int = INITIAL_HOST_LIMIT,
+        min_limit: int = MIN_HOST_LIMIT,
+        max_limit: int = MAX_HOST_LIMIT,
+        latency_target: float = LATENCY_TARGET_SECONDS,
+        decrease_factor: float = DECREASE_FACTOR,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        max_hosts: int = MAX_TRACKED_HOSTS,
+    ):
+        self.global_limit = global_limit
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.max_hosts = max_hosts
+        self.global_semaphore = asyncio.Semaphore(global_limit)
+        self.hosts: OrderedDict[str, HostState] = OrderedDict()
+
+    def connector(self) -> aiohttp.TCPConnector:
+        """TCPConnector с пулом соединений, согласованным с пределами контроллера."""
+        return aiohttp.TCPConnector(
+            limit=self.global_limit,
+            limit_per_host=self.max_limit,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+
+    def host_state(self, host: str) -> HostState:
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = HostState(self.initial_limit)
+            if len(self.hosts) > self.max_hosts:
+                self._evict_idle(host)
+        else:
+            self.hosts.move_to_end(host)
+        return state
+
+    def _evict_idle(self, keep: str) -> None:
+        # Состояние хоста с запросами в работе ещё нужно их слотам, поэтому вытесняется
+        # самый давний хост без них. Если заняты все, словарь временно превышает предел
+        for host, state in self.hosts.items():
+            if not state.in_flight and host != keep:
+                del self.hosts[host]
+                return
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Ждёт свободного места для хоста url и в общем пределе, после запроса подстраивает предел."""
+        state = self.host_state(urlsplit(url).hostname or "")
+        async with state.condition:
+            await state.condition.wait_for(
+                lambda: state.in_flight < max(self.min_limit, int(state.limit))
+            )
+            state.in_flight += 1
+        slot = Slot()
+        start = None
+        cancelled = False
+        try:
+            async with self.global_semaphore:
+                # Задержку меряем, когда оба предела уже пройдены: ожидание общего семафора
+                # не относится к хосту и не должно уменьшать его предел
+                start = time.monotonic()
+                yield slot
+        except asyncio.CancelledError:
+            # Отменённый запрос (проигравший хедж, остановка обхода) ничего не говорит о хосте
+            cancelled = True
+            raise
+        except BaseException:
+            slot.failed = True
+            raise
+        finally:
+            # Как и отмена во время ожидания общего семафора
+            if start is not None and not cancelled:
+                self._update(state, time.monotonic() - start, slot.failed)
+            async with state.condition:
+                state.in_flight -= 1
+                state.condition.notify_all()
+
+    @asynccontextmanager
+    async def try_slot(self, url: str):
+        """
+        Как slot, но не ждёт: если предел хоста или общий предел исчерпан, отдаёт None.
+        Проверка и захват проходят без переключения задач, поэтому место не могут занять между ними.
+        """
+        state = self.host_state(urlsplit(url).hostname or "")
+        if (
+            state.in_flight >= max(self.min_limit, int(state.limit))
+            or self.global_semaphore.locked()
+        ):
+            yield None
+            return
+        async with self.slot(url) as slot:
+            yield slot
+
+    def _update(self, state: HostState, latency: float, failed: bool) -> None:
+        state.error_rate += EWMA_ALPHA * (failed - state.error_rate)
+        if not failed:
+            state.latency = (
+                latency
+                if state.latency is None
+                else state.latency + EWMA_ALPHA * (latency - state.latency)
+            )
+        now = time.monotonic()
+        if failed or latency > self.latency_target:
+            # Мультипликативное уменьшение не чаще раза за среднее время ответа,
+            # чтобы одна пачка медленных ответов не обрушила предел до минимума
+            if now - state.last_decrease >= (state.latency or latency):
+                state.limit = max(self.min_limit, state.limit * self.decrease_factor)
+                state.last_decrease = now
+        else:
+            state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Текущие пределы и статистика по хостам."""
+        return {
+            host: {
+                "limit": round(state.limit, 2),
+                "in_flight": state.in_flight,
+                "latency": state.latency,
+                "error_rate": round(state.error_rate, 3),
+            }
+            for host, state in self.hosts.items()
+        }
+
+
+if __name__ == "__main__":
+
+    async def bounded_hosts():
+        controller = ConcurrencyController(max_hosts=3)
+        async with controller.slot("http://busy.test/"):
+            for n in range(10):
+                async with controller.slot(f"http://idle{n}.test/"):
+                    pass
+            # Занятый хост не вытесняется, даже если он самый давний
+            assert list(controller.hosts) == ["busy.test", "idle8.test", "idle9.test"]
+        controller.host_state("idle8.test")
+        controller.host_state("new.test")
+        assert list(controller.hosts) == ["idle9.test", "idle8.test", "new.test"]
+
+    asyncio.run(bounded_hosts())
@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from multiprocessing import Pipe, Process
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+if not __package__:
+    # Запуск скриптом: относительные импорты работают так же, как при python -m из src
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    __package__ = "_1_week._3_module"
+
+from .fetch_with_parsing.fetch_with_parse import crawl_urls, fetch_and_parse_urls
+from .fetch_with_status_codes.fetch_1_0 import fetch_urls
+
+HOST = "127.0.0.1"
+PORT = 8089
+REQUESTS = 2000
+CONCURRENCY = [1, 10, 50, 200]
+SEED = 42
+CHUNK_SIZE = 16 * 1024  # Размер порции при отдаче chunked-ответа
+
+FETCHERS = ("fetch_urls", "fetch_and_parse_urls", "crawl_urls")
+
+FIELDNAMES = [
+    "fetcher",
+    "concurrency",
+    "requests",
+    "rps",
+    "p50_ms",
+    "p99_ms",
+    "cpu_s",
+    "peak_rss_mb",
+]
+
+
+def parse_latency(spec: str):
+    """
+    Распределение задержки ответа сервера, секунды: "fixed:0.01", "uniform:0.005:0.05",
+    "exp:0.02" (экспоненциальное со средним 0.02) или "pareto:0.01:1.5" (тяжёлый хвост:
+    минимум 0.01, показатель 1.5). Возвращает функцию rng -> задержка.
+    """
+    kind, *params = spec.split(":")
+    values = [float(p) for p in params]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1 / values[0])
+    if kind == "pareto":
+        return lambda rng: values[0] * rng.paretovariate(values[1])
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+
+def make_app(
+    latency: str,
+    body_sizes: list[int],
+    chunked_ratio: float,
+    error_rate: float,
+    json_ratio: float,
+    seed: int,
+) -> web.Application:
+    """
+    Синтетический сервер: параметры ответа на /{n} (задержка, размер тела, chunked или
+    Content-Length, ошибка 500, JSON или HTML) выбираются псевдослучайно по n и seed,
+    поэтому повторные прогоны получают одинаковые ответы.
+    """
+    delay = parse_latency(latency)
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        rng = random.Random(seed * 1_000_003 + int(request.match_info["n"]))
+        await asyncio.sleep(delay(rng))
+        if rng.random() < error_rate:
+            return web.Response(status=500)
+        size = rng.choice(body_sizes)
+        if rng.random() < json_ratio:
+            # JSON заданного размера: строка-заполнитель внутри объекта
+            body = json.dumps({"data": "x" * max(0, size - 12)}).encode()
+            content_type = "application/json"
+        else:
+            body = b"x" * size
+            content_type = "text/html"
+        if rng.random() >= chunked_ratio:
+            return web.Response(body=body, content_type=content_type)
+        response = web.StreamResponse(headers={"Content-Type": content_type})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        try:
+            for start in range(0, len(body), CHUNK_SIZE):
+                await response.write(body[start : start + CHUNK_SIZE])
+            await response.write_eof()
+        except ConnectionResetError:
+            # Фетчер статусов закрывает соединение, не дочитав тело
+            pass
+        return response
+
+    app = web.Application()
+    app.router.add_get("/{n}", handler)
+    return app
+
+
+def serve(host, port, app_kwargs):
+    """Сервер работает в своём процессе, чтобы его CPU и память не смешивались с клиентскими."""
+    web.run_app(make_app(**app_kwargs), host=host, port=port, print=None)
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+class LatencyRecorder:
+    """
+    Точные задержки запросов: от начала запроса до конца тела или, если тело не дочитано
+    (фетчер статусов), до заголовков. Передаётся в фетчеры как metrics - нужен только trace_config.
+    """
+
+    def __init__(self):
+        self.latencies: list[float] = []
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            # Пока тело не дочитано, задержка считается до заголовков ответа
+            index = len(self.latencies)
+            self.latencies.append(time.perf_counter() - ctx.start)
+
+            def on_eof():
+                self.latencies[index] = time.perf_counter() - ctx.start
+
+            params.response.content.on_eof(on_eof)
+
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        return config
+
+
+async def run_fetcher(fetcher, urls, input_path, results_path, concurrency, recorder):
+    if fetcher == "fetch_urls":
+        await fetch_urls(
+            urls,
+            results_path,
+            metrics=recorder,
+            return_results=False,
+            requests_limit=concurrency,
+            max_pending=max(concurrency * 2, 100),
+        )
+    elif fetcher == "fetch_and_parse_urls":
+        await fetch_and_parse_urls(
+            input_path, results_path, metrics=recorder, requests_limit=concurrency
+        )
+    else:
+        await crawl_urls(
+            input_path, results_path, workers=concurrency, metrics=recorder
+        )
+
+
+class IsolatedRunError(RuntimeError):
+    """Процесс замера завершился, не прислав результат."""
+
+
+def peak_rss_mb():
+    """Пиковое потребление памяти текущим процессом и его завершёнными потомками в МБ."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(own, children) / scale
+
+
+def run_isolated(target, *args):
+    """
+    Выполняет target(*args, conn) в отдельном процессе и возвращает то, что он отправил в conn.
+    Если процесс упал или завершился без результата, бросает IsolatedRunError вместо ожидания.
+    """
+    parent_conn, child_conn = Pipe(duplex=False)
+    process = Process(target=target, args=(*args, child_conn))
+    process.start()
+    # Пока в родителе открыта копия передающего конца, recv не получит EOF после
+    # падения потомка и будет ждать вечно
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+        received = True
+    except EOFError:
+        result, received = None, False
+    finally:
+        parent_conn.close()
+        process.join()
+    if not received or process.exitcode != 0:
+        raise IsolatedRunError(
+            f"{target.__name__}{args} завершился с кодом {process.exitcode}"
+        )
+    return result
+
+
+def measure(fetcher, concurrency, requests, base_url, offset, conn):
+    """Выполняется в отдельном процессе, чтобы пиковая память и CPU относились к одному прогону."""
+    # Каждый прогон получает свои URL, чтобы ответы не повторялись между прогонами
+    urls = [f"{base_url}/{offset + i}" for i in range(requests)]
+    recorder = LatencyRecorder()
+    with tempfile.TemporaryDirectory() as workdir:
+        input_path = os.path.join(workdir, "urls.txt")
+        results_path = os.path.join(workdir, "results.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(urls))
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start = time.perf_counter()
+        asyncio.run(
+            run_fetcher(fetcher, urls, input_path, results_path, concurrency, recorder)
+        )
+        elapsed = time.perf_counter() - start
+        after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    conn.send((elapsed, cpu, recorder.latencies, peak_rss_mb()))
+    conn.close()
+
+
+def summarize(fetcher, concurrency, requests, elapsed, cpu, latencies, rss):
+    quantiles = (
+        statistics.quantiles(latencies, n=100, method="inclusive")
+        if len(latencies) > 1
+        else latencies * 99 or [0.0] * 99
+    )
+    return {
+        "fetcher": fetcher,
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "cpu_s": cpu,
+        "peak_rss_mb": rss,
+    }
+
+
+def run_benchmarks(fetchers, concurrency_list, requests, base_url):
+    """Возвращает строки результатов и описания упавших прогонов."""
+    results = []
+    failures = []
+    offset = 0
+    for fetcher in fetchers:
+        for concurrency in concurrency_list:
+            print(f"Запуск '{fetcher}' concurrency={concurrency}...")
+            try:
+                elapsed, cpu, latencies, rss = run_isolated(
+                    measure, fetcher, concurrency, requests, base_url, offset
+                )
+            except IsolatedRunError as e:
+                print(f"  ошибка: {e}")
+                failures.append(str(e))
+                continue
+            finally:
+                offset += requests
+            row = summarize(
+                fetcher, concurrency, requests, elapsed, cpu, latencies, rss
+            )
+            print(
+                f"  {row['rps']:.0f} запр/с, p50 {row['p50_ms']:.1f} мс, "
+                f"p99 {row['p99_ms']:.1f} мс, CPU {row['cpu_s']:.2f} с, "
+                f"пик RSS {row['peak_rss_mb']:.1f} МБ"
+            )
+            results.append(row)
+    return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк фетчеров на локальном синтетическом сервере"
+    )
+    parser.add_argument(
+        "--fetchers", nargs="+", default=list(FETCHERS), choices=FETCHERS
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=CONCURRENCY)
+    parser.add_argument("--requests", type=int, default=REQUESTS)
+    parser.add_argument("--latency", default="exp:0.02", help="см. parse_latency")
+    parser.add_argument("--body-sizes", type=int, nargs="+", default=[1024, 64 * 1024])
+    parser.add_argument("--chunked-ratio", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--json-ratio", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--csv", help="сохранить результаты в CSV")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    args = parser.parse_args(argv)
+
+    # Ошибку в описании задержки показываем до запуска сервера
+    parse_latency(args.latency)
+    server = Process(
+        target=serve,
+        args=(
+            HOST,
+            args.port,
+            {
+                "latency": args.latency,
+                "body_sizes": args.body_sizes,
+                "chunked_ratio": args.chunked_ratio,
+                "error_rate": args.error_rate,
+                "json_ratio": args.json_ratio,
+                "seed": args.seed,
+            },
+        ),
+        daemon=True,
+    )
+    server.start()
+    try:
+        wait_for_port(HOST, args.port)
+        results, failures = run_benchmarks(
+            args.fetchers,
+            args.concurrency,
+            args.requests,
+            f"http://{HOST}:{args.port}",
+        )
+    finally:
+        server.terminate()
+        server.join()
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Запуск из каталога модуля: python fetch_benchmark.py
+    main()
@@ -0,0 +1,231 @@
+import json
+import sqlite3
+import threading
+
+STATE_SUFFIX = ".state.sqlite"  # Файл состояния лежит рядом с файлом результатов
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    done_run INTEGER,
+    seen_session INTEGER,
+    content TEXT
+);
+"""
+
+
+def state_path_for(results_file_path) -> str:
+    """Путь к файлу состояния обхода для файла результатов."""
+    return f"{results_file_path}{STATE_SUFFIX}"
+
+
+class CrawlState:
+    """
+    Состояние обхода в SQLite: какие URL уже обработаны в текущем обходе, какие встречались
+    в текущем запуске (для отбрасывания повторов во входном файле), а также ETag и Last-Modified
+    ответов для условных запросов при следующих обходах.
+
+    Обход - это серия запусков до успешного завершения (finish). Если предыдущий обход прервался
+    и resume=True, новый запуск продолжает его и пропускает обработанные URL, иначе начинается
+    новый обход, в котором все URL запрашиваются заново, но с условными заголовками.
+    URL считается обработанным после записи его результата на диск (см. complete_records).
+    Вместе с валидаторами хранится и сам документ: при ответе 304 он снова попадает в файл
+    результатов, который новый обход начинает с нуля.
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        self.path = path
+        self.lock = threading.Lock()
+        # Соединение используется и из потока записи результатов, доступ защищён lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+        columns = {row[1] for row in self.db.execute("PRAGMA table_info(urls)")}
+        if "content" not in columns:
+            # Файл состояния, созданный до хранения документов
+            self.db.execute("ALTER TABLE urls ADD COLUMN content TEXT")
+        meta = dict(self.db.execute("SELECT key, value FROM meta"))
+        run = meta.get("run", 0)
+        self.resumed = resume and run > 0 and not meta.get("run_finished", 1)
+        self.run = run if self.resumed else run + 1
+        self.session = meta.get("session", 0) + 1
+        self.db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("run", self.run), ("run_finished", 0), ("session", self.session)],
+        )
+        self.db.commit()
+        # Валидаторы ответов, ещё не записанных на диск, в том числе повторно отдаваемых после 304
+        self.pending: dict[str, tuple[str | None, str | None]] = {}
+        self.skipped = 0
+
+    def claim(self, url: str) -> bool:
+        """
+        Отмечает URL как встреченный в этом запуске. Возвращает False, если URL уже
+        обработан в текущем обходе или встречался раньше в этом запуске.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT done_run, seen_session FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+            if row is not None and (row[0] == self.run or row[1] == self.session):
+                self.skipped += 1
+                return False
+            self.db.execute(
+                "INSERT INTO urls (url, seen_session) VALUES (?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET seen_session = excluded.seen_session",
+                (url, self.session),
+            )
+            return True
+
+    def request_headers(self, url: str) -> dict[str, str]:
+        """
+        Заголовки условного запроса по сохранённым ETag и Last-Modified. Без сохранённого
+        документа запрос безусловный: на ответ 304 нечего было бы записать в результаты.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified FROM urls WHERE url = ? AND content IS NOT NULL",
+                (url,),
+            ).fetchone()
+        headers = {}
+        if row is not None:
+            etag, last_modified = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def remember(self, url: str, response_headers) -> None:
+        """Запоминает валидаторы ответа до записи его результата на диск."""
+        with self.lock:
+            self.pending[url] = (
+                response_headers.get("ETag"),
+                response_headers.get("Last-Modified"),
+            )
+
+    def not_modified(self, url: str):
+        """
+        Ответ 304: тело не загружается, возвращается документ из прошлого обхода (None, если
+        его нет). Валидаторы остаются прежними и сохраняются вместе с повторной записью.
+        """
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified, content FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None or row[2] is None:
+                return None
+            self.pending[url] = (row[0], row[1])
+        return json.loads(row[2])
+
+    def complete_records(self, records) -> None:
+        """
+        Отмечает обработанными URL записей, уже записанных в файл результатов, и сохраняет
+        их валидаторы. Документ сохраняется, только если есть валидаторы, иначе ответа 304
+        не будет. Предназначен для on_flush у ResultSink, вызывается из потока записи.
+        """
+        with self.lock:
+            rows = []
+            for record in records:
+                url = record["url"]
+                etag, last_modified = self.pending.pop(url, (None, None))
+                content = (
+                    json.dumps(record["content"], ensure_ascii=False)
+                    if etag or last_modified
+                    else None
+                )
+                rows.append((etag, last_modified, content, self.run, url))
+            self.db.executemany(
+                "UPDATE urls SET etag = ?, last_modified = ?, content = ?, done_run = ? "
+                "WHERE url = ?",
+                rows,
+            )
+            self.db.commit()
+
+    def finish(self) -> None:
+        """Отмечает обход завершённым: следующий запуск начнёт новый обход."""
+        with self.lock:
+            self.db.execute("UPDATE meta SET value = 1 WHERE key = 'run_finished'")
+            self.db.commit()
+
+    def close(self) -> None:
+        with self.lock:
+            self.db.commit()
+            self.db.close()
+
+
+if __name__ == "__main__":
+    # Запуск из каталога модуля: python crawl_state.py
+    import asyncio
+    import os
+    import sys
+    import tempfile
+    from pathlib import Path
+
+    from aiohttp import web
+
+    if not __package__:
+        sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+        __package__ = "_1_week._3_module.fetch_with_parsing"
+
+    from .fetch_with_parse import fetch_and_parse_urls
+
+    documents = {"a": {"n": 1}, "b": {"n": 2}, "c": {"n": 3}}
+    bodies_sent = []
+
+    async def handler(request: web.Request) -> web.Response:
+        name = request.match_info["name"]
+        etag = f'"{name}-{documents[name]["n"]}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        bodies_sent.append(name)
+        return web.json_response(documents[name], headers={"ETag": etag})
+
+    def write_urls(path, port):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(f"http://127.0.0.1:{port}/{name}" for name in documents))
+
+    def read_results(path):
+        with open(path, encoding="utf-8") as f:
+            return {
+                record["url"].rsplit("/", 1)[1]: record["content"]
+                for record in map(json.loads, f)
+            }
+
+    async def check(workdir):
+        app = web.Application()
+        app.router.add_get("/{name}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        input_path = os.path.join(workdir, "urls.txt")
+        results_path = os.path.join(workdir, "results.jsonl")
+        write_urls(input_path, runner.addresses[0][1])
+        try:
+            await fetch_and_parse_urls(input_path, results_path, resumable=True)
+            assert read_results(results_path) == documents
+            assert sorted(bodies_sent) == ["a", "b", "c"]
+
+            # Повторный обход: неизменившиеся документы приходят ответом 304, но
+            # в новом файле результатов есть все документы
+            bodies_sent.clear()
+            documents["b"] = {"n": 20}
+            await fetch_and_parse_urls(input_path, results_path, resumable=True)
+            assert bodies_sent == ["b"]
+            assert read_results(results_path) == documents
+
+            # Третий обход: изменённый документ тоже сохранён для ответа 304
+            bodies_sent.clear()
+            await fetch_and_parse_urls(input_path, results_path, resumable=True)
+            assert bodies_sent == []
+            assert read_results(results_path) == documents
+        finally:
+            await runner.cleanup()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        asyncio.run(check(workdir))
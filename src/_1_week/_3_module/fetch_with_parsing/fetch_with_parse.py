@@ -1,13 +1,41 @@
 import asyncio
 import json
+import sqlite3
+import sys
+from functools import partial
+from pathlib import Path
 
 import aiohttp
 
+if not __package__:
+    # Запуск скриптом: относительные импорты работают так же, как при python -m из src
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    __package__ = "_1_week._3_module.fetch_with_parsing"
+
+from ..concurrency import ConcurrencyController, semaphore_slot, try_semaphore_slot
+from ..request_policy import (
+    RETRY_STATUSES,
+    RETRYABLE_ERRORS,
+    RequestPolicy,
+    RetryableStatus,
+)
+from ..result_sink import ResultSink
+from ..tracing import FetchMetrics
+from .crawl_state import CrawlState, state_path_for
+from .json_stream import (
+    MAX_ITEM_SIZE_MB,
+    BodyTooLarge,
+    iter_body,
+    iter_items,
+    read_json,
+)
+
 REQUESTS_LIMIT = 5
 TIMEOUT_SECONDS = 10  # Таймаут для каждого HTTP-запроса
 MAX_JSON_SIZE_MB = (
     500  # Максимально допустимый размер JSON для попытки загрузки и парсинга
 )
+QUEUE_SIZE = 1000  # Сколько URL конвейерный режим читает из файла наперёд
 INPUT_URLS_FILE = "urls.txt"
 RESULTS_FILE_PATH = "results.jsonl"
 
@@ -17,79 +45,229 @@ async def fetch_and_parse_url(
     semaphore: asyncio.Semaphore,
     url: str,
     timeout_seconds: int = TIMEOUT_SECONDS,
+    max_bytes: int = MAX_JSON_SIZE_MB * 1024 * 1024,
+    controller: ConcurrencyController | None = None,
+    policy: RequestPolicy | None = None,
+    state: CrawlState | None = None,
 ) -> tuple[str, dict | None]:
-    """Функция асинхронного извлечения URL и парсинга JSON-ответов URL ввиде строки"""
+    """
+    Функция асинхронного извлечения URL и парсинга JSON-ответов URL ввиде строки.
+    Тело читается потоково и чтение прерывается, как только получено больше max_bytes байт.
+    Если передан controller, параллельность ограничивается им по хостам вместо semaphore,
+    policy задаёт повторы, общий срок и хеджирование запроса (см. RequestPolicy).
+    С state запрос отправляется с условными заголовками, при ответе 304 тело не загружается,
+    а возвращается документ, сохранённый в state при прошлом обходе.
+    """
+    headers = state.request_headers(url) if state is not None else None
+
+    async def attempt() -> dict | None:
+        async with session.get(
+            url, timeout=timeout_seconds, headers=headers
+        ) as response:
+            if response.status in RETRY_STATUSES:
+                raise RetryableStatus(response.status)
+            # 5xx - признак перегрузки хоста
+            slot.failed = response.status >= 500
+            if response.status == 304 and state is not None:
+                # Документ не изменился с прошлого обхода: записываем сохранённую копию,
+                # потому что файл результатов нового обхода начинается с нуля
+                return state.not_modified(url)
+            if response.status != 200:
+                # Проверка успешности HTTP-статуса
+                return None
+            content_type = response.headers.get("Content-Type", "")
+            # Проверка Content-Type на наличие JSON
+            if (
+                "application/json" not in content_type
+                and "text/json" not in content_type
+            ):
+                return None
+
+            content_length = int(response.headers.get("Content-Length", "0"))
+            # Проверка размера контента по заголовку Content-Length
+            if content_length > max_bytes:
+                return None
+
+            try:
+                # Content-Length может отсутствовать (chunked), поэтому лимит проверяется и при чтении
+                json_content = await read_json(response, max_bytes)
+                if state is not None:
+                    state.remember(url, response.headers)
+                return json_content
+            except BodyTooLarge as e:
+                print(f"Ответ {url} слишком большой: {e}")
+                return None
+            except json.JSONDecodeError as e:
+                print(f"Ошибка декодирования JSON из {url}: {e}")
+                return None
+            except RETRYABLE_ERRORS:
+                # Обрыв соединения или таймаут при чтении тела можно повторить
+                raise
+            except Exception as e:
+                print(f"Неожиданная ошибка {type(e).__name__} - {e}")
+                return None
+
+    if controller is None:
+        limiter = semaphore_slot(semaphore)
+        hedge_slot = partial(try_semaphore_slot, semaphore)
+    else:
+        limiter = controller.slot(url)
+        hedge_slot = partial(controller.try_slot, url)
+    async with limiter as slot:
+        try:
+            json_content = await (
+                attempt() if policy is None else policy.run(url, attempt, hedge_slot)
+            )
+            return url, json_content
+        except RetryableStatus as e:
+            slot.failed = True
+            print(f"Ответ {url} со статусом {e.status}")
+            return url, None
+        except aiohttp.ClientError as e:
+            slot.failed = True
+            print(f"ClientError {type(e).__name__} - {e}")
+            return url, None
+        except asyncio.TimeoutError:
+            slot.failed = True
+            print("Время ожидания ответа превышено")
+            return url, None
+        except Exception as e:
+            slot.failed = True
+            print(f"Неожиданная ошибка {type(e).__name__} - {e}")
+            return url, None
+
+
+async def stream_json_items(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    path: tuple[str, ...] = (),
+    timeout_seconds: int = TIMEOUT_SECONDS,
+    max_bytes: int = MAX_JSON_SIZE_MB * 1024 * 1024,
+    max_item_bytes: int = MAX_ITEM_SIZE_MB * 1024 * 1024,
+):
+    """
+    Асинхронный генератор элементов JSON-массива, лежащего в ответе по пути path
+    (например, ("data", "items")), без загрузки всего документа в память.
+    """
     async with semaphore:
         try:
             async with session.get(url, timeout=timeout_seconds) as response:
-                if response.status != 200:
-                    # Проверка успешности HTTP-статуса
-                    return url, None
                 content_type = response.headers.get("Content-Type", "")
-                # Проверка Content-Type на наличие JSON
-                if (
+                if response.status != 200 or (
                     "application/json" not in content_type
                     and "text/json" not in content_type
                 ):
-                    return url, None
-
-                content_length = int(response.headers.get("Content-Length", "0"))
-                # Проверка размера контента по заголовку Content-Length
-                if content_length > MAX_JSON_SIZE_MB * 1024 * 1024:
-                    return url, None
-
-                try:
-                    json_content = await response.json()
-                    return url, json_content
-                except aiohttp.ContentTypeError:
-                    print(
-                        f"Некорректный Content-Type для JSON из {url}. Невозможно распарсить JSON."
-                    )
-                    return url, None
-                except json.JSONDecodeError as e:
-                    print(f"Ошибка декодирования JSON из {url}: {e}")
-                    return url, None
-                except Exception as e:
-                    print(f"Неожиданная ошибка {type(e).__name__} - {e}")
-                    return url, None
-
+                    return
+                async for item in iter_items(
+                    iter_body(response, max_bytes), path, max_item_bytes
+                ):
+                    yield item
+        except BodyTooLarge as e:
+            print(f"Ответ {url} слишком большой: {e}")
+        except json.JSONDecodeError as e:
+            print(f"Ошибка декодирования JSON из {url}: {e}")
         except aiohttp.ClientError as e:
             print(f"ClientError {type(e).__name__} - {e}")
-            return url, None
         except asyncio.TimeoutError:
             print("Время ожидания ответа превышено")
-            return url, None
-        except Exception as e:
-            print(f"Неожиданная ошибка {type(e).__name__} - {e}")
-            return url, None
+
+
+def open_output(
+    results_file_path: str,
+    compression: str | None,
+    fsync_every: int | None,
+    resumable: bool,
+) -> tuple[ResultSink, CrawlState | None]:
+    """
+    Открывает файл результатов и, если resumable=True, состояние обхода рядом с ним.
+    При продолжении прерванного обхода результаты дописываются в конец файла.
+    """
+    state = CrawlState(state_path_for(results_file_path)) if resumable else None
+    try:
+        output_file = ResultSink(
+            results_file_path,
+            compression=compression,
+            fsync_every=fsync_every,
+            append=state is not None and state.resumed,
+            on_flush=state.complete_records if state is not None else None,
+        )
+    except Exception:
+        if state is not None:
+            state.close()
+        raise
+    return output_file, state
+
+
+async def close_output(
+    output_file: ResultSink, state: CrawlState | None, completed: bool
+) -> None:
+    await asyncio.to_thread(output_file.close)
+    if state is not None:
+        if completed:
+            state.finish()
+        state.close()
 
 
 async def fetch_and_parse_urls(
     input_file_path: str,
     results_file_path: str,
+    compression: str | None = None,
+    fsync_every: int | None = None,
+    controller: ConcurrencyController | None = None,
+    policy: RequestPolicy | None = None,
+    metrics: FetchMetrics | None = None,
+    resumable: bool = False,
+    requests_limit: int = REQUESTS_LIMIT,
 ) -> dict[str, dict]:
     """
-    Функция асинхронного извлечения URL и парсинга JSON-ответов из файла с URL и записи их в файл
+    Функция асинхронного извлечения URL и парсинга JSON-ответов из файла с URL и записи их в файл.
+    Запись идёт пачками в отдельном потоке (см. ResultSink), compression - "gzip" или "zstd".
+    С controller параллельность подстраивается по каждому хосту (см. ConcurrencyController),
+    policy включает повторы и хеджирование запросов (см. RequestPolicy),
+    metrics собирает длительности фаз запросов по хостам (см. FetchMetrics).
+    Повторяющиеся URL запрашиваются один раз. С resumable=True состояние обхода хранится
+    рядом с файлом результатов (см. CrawlState): перезапуск после сбоя пропускает обработанные URL,
+    а следующие обходы отправляют условные запросы и не загружают неизменившиеся документы.
+    Без controller одновременно выполняется не больше requests_limit запросов.
     """
     successful_results: dict[str, dict] = {}
-    semaphore = asyncio.Semaphore(REQUESTS_LIMIT)
+    semaphore = asyncio.Semaphore(requests_limit)
     try:
-        output_file = open(results_file_path, "w", encoding="utf-8")
-    except IOError as e:
+        output_file, state = open_output(
+            results_file_path, compression, fsync_every, resumable
+        )
+    except (IOError, ValueError, sqlite3.Error) as e:
         print(f"Невозможно открыть файл '{results_file_path}': {e}.")
         return {}
 
+    completed = False
     try:
-        async with aiohttp.ClientSession() as session:
+        connector = controller.connector() if controller is not None else None
+        trace_configs = [metrics.trace_config()] if metrics is not None else None
+        async with aiohttp.ClientSession(
+            connector=connector, trace_configs=trace_configs
+        ) as session:
             # Создаем одну HTTP-сессию aiohttp для всех запросов
             requests = []
+            seen = set()
             try:
                 with open(input_file_path, "r", encoding="utf-8") as f_input:
                     for line in f_input:
                         url = line.strip()
-                        if url:  # Пропускаем пустые строки
+                        if not url or url in seen:  # Пропускаем пустые строки и повторы
+                            continue
+                        seen.add(url)
+                        if state is None or state.claim(url):
                             requests.append(
-                                fetch_and_parse_url(session, semaphore, url)
+                                fetch_and_parse_url(
+                                    session,
+                                    semaphore,
+                                    url,
+                                    controller=controller,
+                                    policy=policy,
+                                    state=state,
+                                )
                             )
             except IOError as e:
                 print(f"Невозможно открыть файл '{input_file_path}': {e}.")
@@ -101,25 +279,115 @@ async def fetch_and_parse_urls(
 
                 if json_content is not None:
                     successful_results[url] = json_content
-                    try:
-                        json_line = json.dumps(
-                            {"url": url, "content": json_content}, ensure_ascii=False
-                        )
-                        output_file.write(json_line + "\n")
-                        # output_file.flush() гарантирует, что данные будут записаны на диск после каждого успешного запроса.
-                        output_file.flush()
-                    except Exception as e:
-                        print(
-                            f"Ошибка при записи результата для URL '{url}' в файл: {e}"
-                        )
+                    # Сериализация и запись выполняются в потоке ResultSink, не задерживая цикл событий
+                    await output_file.put({"url": url, "content": json_content})
+        completed = True
+    finally:
+        await close_output(output_file, state, completed)
+
+    return successful_results
+
+
+async def crawl_urls(
+    input_file_path: str,
+    results_file_path: str,
+    workers: int = REQUESTS_LIMIT,
+    queue_size: int = QUEUE_SIZE,
+    return_results: bool = False,
+    compression: str | None = None,
+    fsync_every: int | None = None,
+    controller: ConcurrencyController | None = None,
+    policy: RequestPolicy | None = None,
+    metrics: FetchMetrics | None = None,
+    resumable: bool = False,
+) -> dict[str, dict] | None:
+    """
+    Конвейерный режим для больших файлов с URL: URL читаются из файла лениво в ограниченную очередь,
+    их обрабатывает фиксированное число рабочих задач, результаты сразу пишутся в файл.
+    Память не зависит от количества URL; словарь результатов собирается, только если return_results=True.
+    С controller число рабочих задач - верхняя граница, а фактическая параллельность
+    подстраивается по каждому хосту (см. ConcurrencyController),
+    policy включает повторы и хеджирование запросов (см. RequestPolicy);
+    её метрики по URL хранятся только для последних max_tracked_urls адресов.
+    metrics собирает длительности фаз запросов по хостам (см. FetchMetrics).
+    С resumable=True повторы URL отбрасываются, а обход можно продолжить после сбоя
+    (см. fetch_and_parse_urls и CrawlState); без него повторы не отслеживаются.
+    """
+    successful_results: dict[str, dict] | None = {} if return_results else None
+    # Параллельность ограничена числом рабочих задач, семафор нужен для fetch_and_parse_url
+    semaphore = asyncio.Semaphore(workers)
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=queue_size)
+    try:
+        output_file, state = open_output(
+            results_file_path, compression, fsync_every, resumable
+        )
+    except (IOError, ValueError, sqlite3.Error) as e:
+        print(f"Невозможно открыть файл '{results_file_path}': {e}.")
+        return successful_results
+
+    async def producer():
+        try:
+            with open(input_file_path, "r", encoding="utf-8") as f_input:
+                for line in f_input:
+                    url = line.strip()
+                    # Пропускаем пустые строки, а с состоянием обхода - повторы и обработанные URL
+                    if url and (state is None or state.claim(url)):
+                        # Если очередь заполнена, чтение файла ждёт освобождения места
+                        await queue.put(url)
+        except IOError as e:
+            print(f"Невозможно открыть файл '{input_file_path}': {e}.")
+        # Сигнал завершения для каждой рабочей задачи. Не в finally: при отмене рабочие
+        # задачи уже не читают очередь, и запись в заполненную очередь ждала бы вечно
+        for _ in range(workers):
+            await queue.put(None)
+
+    async def worker(session: aiohttp.ClientSession):
+        while (url := await queue.get()) is not None:
+            url, json_content = await fetch_and_parse_url(
+                session,
+                semaphore,
+                url,
+                controller=controller,
+                policy=policy,
+                state=state,
+            )
+            if json_content is None:
+                continue
+            if successful_results is not None:
+                successful_results[url] = json_content
+            await output_file.put({"url": url, "content": json_content})
+
+    completed = False
+    try:
+        connector = controller.connector() if controller is not None else None
+        trace_configs = [metrics.trace_config()] if metrics is not None else None
+        async with aiohttp.ClientSession(
+            connector=connector, trace_configs=trace_configs
+        ) as session:
+            tasks = [
+                asyncio.ensure_future(producer()),
+                *(asyncio.ensure_future(worker(session)) for _ in range(workers)),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # Если одна задача упала, остальные отменяются до закрытия сессии и файла
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        completed = True
     finally:
-        output_file.close()
+        await close_output(output_file, state, completed)
 
     return successful_results
 
 
 if __name__ == "__main__":
+    # Запуск из каталога модуля: python fetch_with_parse.py
+    module_dir = Path(__file__).parent
     processed_results = asyncio.run(
-        fetch_and_parse_url(INPUT_URLS_FILE, RESULTS_FILE_PATH)
+        fetch_and_parse_urls(
+            module_dir / INPUT_URLS_FILE, module_dir / RESULTS_FILE_PATH
+        )
     )
     print(processed_results)
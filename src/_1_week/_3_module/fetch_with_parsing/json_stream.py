@@ -0,0 +1,226 @@
+import codecs
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+
+CHUNK_SIZE = 64 * 1024  # Размер порции при чтении тела ответа
+MAX_ITEM_SIZE_MB = 16  # Максимальный размер одного значения при потоковом разборе
+
+_WHITESPACE = " \t\n\r"
+# Символы, которыми может продолжаться число: "0" перед ".25" или "1" перед "e3"
+_NUMBER_CHARS = "0123456789+-.eE"
+_json_decoder = json.JSONDecoder()
+
+
+class BodyTooLarge(Exception):
+    """Тело ответа или отдельное значение превысило допустимый размер."""
+
+
+async def iter_body(
+    response, max_bytes: int, chunk_size: int = CHUNK_SIZE
+) -> AsyncIterator[bytes]:
+    """
+    Читает тело ответа aiohttp порциями и прерывает чтение, как только
+    получено больше max_bytes байт, независимо от заголовка Content-Length.
+    """
+    received = 0
+    async for chunk in response.content.iter_chunked(chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise BodyTooLarge(f"Тело ответа больше {max_bytes} байт")
+        yield chunk
+
+
+async def read_json(response, max_bytes: int, chunk_size: int = CHUNK_SIZE) -> Any:
+    """Загружает и разбирает JSON целиком, держа в памяти не больше max_bytes байт тела."""
+    body = bytearray()
+    async for chunk in iter_body(response, max_bytes, chunk_size):
+        body += chunk
+    return json.loads(body)
+
+
+class JsonStream:
+    """
+    Потоковый разбор JSON поверх асинхронного источника порций байт.
+    В памяти держится только текущее значение, а не весь документ.
+    """
+
+    def __init__(
+        self,
+        chunks: AsyncIterator[bytes],
+        max_item_bytes: int = MAX_ITEM_SIZE_MB * 1024 * 1024,
+    ):
+        self.chunks = aiter(chunks)
+        self.max_item_bytes = max_item_bytes
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    async def _fill(self, min_size: int = 1) -> bool:
+        """Дочитывает в буфер не меньше min_size символов, возвращает False в конце потока."""
+        if self.pos:
+            # Отбрасываем уже разобранную часть буфера
+            self.buffer = self.buffer[self.pos :]
+            self.pos = 0
+        target = len(self.buffer) + min_size
+        while len(self.buffer) < target:
+            if self.eof:
+                return False
+            try:
+                chunk = await anext(self.chunks)
+            except StopAsyncIteration:
+                self.eof = True
+                self.buffer += self.decoder.decode(b"", final=True)
+                continue
+            self.buffer += self.decoder.decode(chunk)
+        return True
+
+    async def _peek(self) -> str | None:
+        """Пропускает пробельные символы и возвращает следующий символ, не потребляя его."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not await self._fill():
+                return None
+
+    async def _expect(self, char: str) -> None:
+        found = await self._peek()
+        if found != char:
+            raise json.JSONDecodeError(
+                f"Ожидался символ {char!r}, получен {found!r}", self.buffer, self.pos
+            )
+        self.pos += 1
+
+    async def read_value(self) -> Any:
+        """Разбирает очередное значение целиком."""
+        await self._peek()
+        while True:
+            try:
+                value, end = _json_decoder.raw_decode(self.buffer, self.pos)
+                # Число, за которым в буфере нет разделителя, может продолжиться в
+                # следующей порции: "0." разбирается как 0, хотя дальше придёт "25"
+                if self.eof or (
+                    end < len(self.buffer)
+                    and not (
+                        isinstance(value, (int, float))
+                        and self.buffer[end] in _NUMBER_CHARS
+                    )
+                ):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            pending = len(self.buffer) - self.pos
+            if pending > self.max_item_bytes:
+                raise BodyTooLarge(f"Значение JSON больше {self.max_item_bytes} байт")
+            # Значение неполное: удваиваем буфер, чтобы повторный разбор был амортизированно линейным
+            await self._fill(max(pending, CHUNK_SIZE))
+
+    async def seek(self, path: tuple[str, ...]) -> bool:
+        """
+        Спускается по ключам объектов path и останавливается перед значением.
+        Соседние значения разбираются по одному и отбрасываются. Возвращает False, если пути нет.
+        """
+        for key in path:
+            if await self._peek() != "{":
+                return False
+            self.pos += 1
+            while True:
+                if await self._peek() == "}":
+                    return False
+                name = await self.read_value()
+                await self._expect(":")
+                if name == key:
+                    break
+                await self.read_value()
+                if await self._peek() == ",":
+                    self.pos += 1
+        return True
+
+    async def iter_array(self) -> AsyncIterator[Any]:
+        """Отдаёт элементы массива, перед которым стоит поток, по одному."""
+        await self._expect("[")
+        if await self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield await self.read_value()
+            if await self._peek() == ",":
+                self.pos += 1
+                continue
+            await self._expect("]")
+            return
+
+
+async def iter_items(
+    chunks: AsyncIterator[bytes],
+    path: tuple[str, ...] = (),
+    max_item_bytes: int = MAX_ITEM_SIZE_MB * 1024 * 1024,
+) -> AsyncIterator[Any]:
+    """Отдаёт по одному элементы массива, лежащего по пути path (пустой путь - корневой массив)."""
+    stream = JsonStream(chunks, max_item_bytes)
+    if await stream.seek(path):
+        async for item in stream.iter_array():
+            yield item
+
+
+async def read_path(
+    chunks: AsyncIterator[bytes],
+    path: tuple[str, ...],
+    default: Any = None,
+    max_item_bytes: int = MAX_ITEM_SIZE_MB * 1024 * 1024,
+) -> Any:
+    """Извлекает одно значение по пути path, не загружая весь документ."""
+    stream = JsonStream(chunks, max_item_bytes)
+    if await stream.seek(path):
+        return await stream.read_value()
+    return default
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def parse_chunks(chunks, path, is_array):
+        async def source():
+            for chunk in chunks:
+                yield chunk
+
+        items = (
+            [item async for item in iter_items(source(), path)] if is_array else None
+        )
+        return items, await read_path(source(), path)
+
+    documents = [
+        (b'{"n": 0.25}', ("n",)),
+        (b'{"a": [1, -2.5e-3, 1E+10, 0, 12345678901234567890]}', ("a",)),
+        (
+            b'[-0.125,3e2 , true,null,false, "\xd1\x82\xd0\xb5\xd0\xba\xd1\x81\xd1\x82"]',
+            (),
+        ),
+        (
+            b'{"x": {"y": 1}, "data": {"items": [{"k": 1.5}, [2], "s\\"", 7]}}',
+            ("data", "items"),
+        ),
+        (b"42", ()),
+        (b"[1.5]", ()),
+    ]
+    # Каждый документ режется во всех точках и на порции всех размеров: значение
+    # не должно зависеть от того, где проходит граница порции
+    for document, path in documents:
+        expected = json.loads(document)
+        for key in path:
+            expected = expected[key]
+        is_array = isinstance(expected, list)
+        splits = [[document[:i], document[i:]] for i in range(len(document) + 1)]
+        splits += [
+            [document[i : i + size] for i in range(0, len(document), size)]
+            for size in range(1, len(document) + 1)
+        ]
+        for chunks in splits:
+            items, value = asyncio.run(parse_chunks(chunks, path, is_array))
+            assert value == expected, (chunks, value)
+            assert items == (expected if is_array else None), (chunks, items)
@@ -0,0 +1,208 @@
+import asyncio
+import os
+import queue
+import shutil
+import sys
+import time
+import zlib
+from contextlib import ExitStack
+from multiprocessing import Process, Queue
+from pathlib import Path
+from urllib.parse import urlsplit
+
+if not __package__:
+    # Запуск скриптом: относительные импорты работают так же, как при python -m из src
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    __package__ = "_1_week._3_module.fetch_with_parsing"
+
+from ..tracing import FetchMetrics
+from .fetch_with_parse import (
+    INPUT_URLS_FILE,
+    REQUESTS_LIMIT,
+    RESULTS_FILE_PATH,
+    crawl_urls,
+)
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+REPORT_INTERVAL = 2.0  # Как часто рабочие процессы присылают метрики, секунды
+
+
+def shard_of(url: str, shards: int) -> int:
+    """
+    Номер шарда по хосту URL: все URL одного хоста попадают в один процесс и переиспользуют
+    его соединения. crc32 вместо hash(), потому что hash() строк отличается между процессами.
+    """
+    host = urlsplit(url).hostname or ""
+    return zlib.crc32(host.encode()) % shards
+
+
+def split_input(input_file_path, shard_paths: list[str]) -> list[int]:
+    """Раскладывает URL из файла по файлам шардов построчно, возвращает число URL в каждом."""
+    counts = [0] * len(shard_paths)
+    with ExitStack() as stack:
+        files = [
+            stack.enter_context(open(path, "w", encoding="utf-8"))
+            for path in shard_paths
+        ]
+        with open(input_file_path, "r", encoding="utf-8") as f_input:
+            for line in f_input:
+                url = line.strip()
+                if url:
+                    index = shard_of(url, len(files))
+                    files[index].write(url + "\n")
+                    counts[index] += 1
+    return counts
+
+
+async def _run_shard(index, input_path, output_path, options, progress, interval):
+    metrics = FetchMetrics()
+
+    async def report():
+        while True:
+            await asyncio.sleep(interval)
+            progress.put(("progress", index, metrics.snapshot()))
+
+    reporter = asyncio.create_task(report())
+    try:
+        await crawl_urls(input_path, output_path, metrics=metrics, **options)
+    finally:
+        reporter.cancel()
+    progress.put(("done", index, metrics.snapshot()))
+
+
+def shard_worker(
+    index, input_path, output_path, options, use_uvloop, progress, interval
+):
+    """Рабочий процесс: свой цикл событий, своя сессия и свой файл результатов."""
+    coroutine = _run_shard(index, input_path, output_path, options, progress, interval)
+    if use_uvloop and uvloop is not None:
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            runner.run(coroutine)
+    else:
+        asyncio.run(coroutine)
+
+
+def combine(snapshots: dict[int, dict]) -> dict[str, dict]:
+    """Объединяет снимки метрик шардов: хосты не пересекаются между шардами."""
+    hosts = {}
+    for snapshot in snapshots.values():
+        hosts.update(snapshot)
+    return hosts
+
+
+def totals(hosts: dict[str, dict]) -> dict[str, int]:
+    return {
+        "requests": sum(h["requests"] for h in hosts.values()),
+        "errors": sum(h["errors"] for h in hosts.values()),
+        "bytes": sum(h["bytes"] for h in hosts.values()),
+    }
+
+
+def merge_shards(shard_paths: list[str], results_file_path) -> None:
+    """
+    Склеивает файлы шардов в один файл результатов. Строки JSONL склеиваются как есть,
+    сжатые gzip и zstd файлы - как последовательность фрагментов, которую оба формата читают подряд.
+    """
+    with open(results_file_path, "wb") as output:
+        for path in shard_paths:
+            if os.path.exists(path):
+                with open(path, "rb") as shard:
+                    shutil.copyfileobj(shard, output)
+                os.remove(path)
+
+
+def fetch_and_parse_sharded(
+    input_file_path,
+    results_file_path,
+    shards: int | None = None,
+    workers: int = REQUESTS_LIMIT,
+    use_uvloop: bool = False,
+    compression: str | None = None,
+    report_interval: float = REPORT_INTERVAL,
+) -> dict[str, dict]:
+    """
+    Шардированный режим fetch_and_parse_urls: URL делятся между shards процессами по хосту,
+    каждый процесс обходит свою часть через crawl_urls с workers рабочими задачами
+    (и uvloop, если он установлен и use_uvloop=True) и пишет свой файл. Координатор печатает
+    общий прогресс, склеивает файлы шардов в results_file_path и возвращает метрики по хостам.
+    """
+    shards = shards or os.cpu_count() or 1
+    if use_uvloop and uvloop is None:
+        print("uvloop не установлен, используется стандартный цикл событий")
+    input_paths = [f"{results_file_path}.shard{i}.urls" for i in range(shards)]
+    output_paths = [f"{results_file_path}.shard{i}" for i in range(shards)]
+    try:
+        counts = split_input(input_file_path, input_paths)
+    except IOError as e:
+        print(f"Невозможно открыть файл '{input_file_path}': {e}.")
+        return {}
+
+    progress = Queue()
+    options = {"workers": workers, "compression": compression}
+    processes = [
+        Process(
+            target=shard_worker,
+            args=(
+                i,
+                input_paths[i],
+                output_paths[i],
+                options,
+                use_uvloop,
+                progress,
+                report_interval,
+            ),
+        )
+        for i in range(shards)
+        if counts[i]
+    ]
+    for process in processes:
+        process.start()
+
+    snapshots: dict[int, dict] = {}
+    finished = set()
+    total_urls = sum(counts)
+    start = time.perf_counter()
+    try:
+        while len(finished) < len(processes):
+            try:
+                kind, index, snapshot = progress.get(timeout=report_interval)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    # Процесс упал, не прислав итог: дальше ждать нечего
+                    break
+                continue
+            snapshots[index] = snapshot
+            if kind == "done":
+                finished.add(index)
+            summary = totals(combine(snapshots))
+            elapsed = time.perf_counter() - start
+            print(
+                f"Шардов завершено {len(finished)}/{len(processes)}, "
+                f"запросов {summary['requests']}/{total_urls}, ошибок {summary['errors']}, "
+                f"получено {summary['bytes'] / 1024 / 1024:.1f} МБ, "
+                f"{summary['requests'] / elapsed:.0f} запр/с"
+            )
+    finally:
+        for process in processes:
+            process.join()
+        for path in input_paths:
+            os.remove(path)
+        merge_shards(output_paths, results_file_path)
+
+    failed = [p.exitcode for p in processes if p.exitcode]
+    if failed:
+        print(f"Рабочих процессов завершилось с ошибкой: {len(failed)}")
+    return combine(snapshots)
+
+
+if __name__ == "__main__":
+    # Запуск из каталога модуля: python sharded.py
+    module_dir = Path(__file__).parent
+    hosts = fetch_and_parse_sharded(
+        module_dir / INPUT_URLS_FILE, module_dir / RESULTS_FILE_PATH
+    )
+    print(totals(hosts))
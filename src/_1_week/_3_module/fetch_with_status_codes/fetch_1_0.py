@@ -1,13 +1,29 @@
 import asyncio
-import json
+import sys
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from functools import partial
+from pathlib import Path
 
 from aiohttp import ClientError, ClientSession
 
+if not __package__:
+    # Запуск скриптом: относительные импорты работают так же, как при python -m из src
+    sys.path.insert(0, str(Path(__file__).resolve().parents[3]))
+    __package__ = "_1_week._3_module.fetch_with_status_codes"
+
+from ..concurrency import ConcurrencyController, semaphore_slot, try_semaphore_slot
+from ..request_policy import RETRY_STATUSES, RequestPolicy, RetryableStatus
+from ..result_sink import ResultSink
+from ..tracing import FetchMetrics
+
 TIMEOUT_SECONDS = 5
 ERROR_STATUS = 0
 ERROR_TIMEOUT_STATUS = 408
 CLIENT_ERROR_STATUS = 400
 REQUESTS_LIMIT = 5
+MAX_PENDING = 100  # Сколько запросов fetch_urls держит запущенными одновременно
+# Статусы, которыми сервер сообщает, что не поддерживает HEAD
+HEAD_REJECTED_STATUSES = frozenset({405, 501})
 FILE_PATH = "results.jsonl"
 
 
@@ -16,55 +32,172 @@ async def fetch_url(
     semaphore: asyncio.Semaphore,
     url: str,
     timeout_seconds: int = TIMEOUT_SECONDS,
+    controller: ConcurrencyController | None = None,
+    policy: RequestPolicy | None = None,
+    probe: bool = False,
 ) -> tuple[str, int]:
-    """Функция асинхронного извлечения URL и статуса ответа из одного запроса"""
-    async with semaphore:
-        try:
+    """
+    Функция асинхронного извлечения URL и статуса ответа из одного запроса.
+    Если передан controller, параллельность ограничивается им по хостам вместо semaphore,
+    policy задаёт повторы, общий срок и хеджирование запроса (см. RequestPolicy).
+    probe=True - проверка только статуса без загрузки тела (см. probe_status).
+    """
+
+    async def attempt() -> int:
+        if probe:
+            status = await probe_status(session, url, timeout_seconds)
+        else:
             async with session.get(url, timeout=timeout_seconds) as response:
-                return url, response.status
+                status = response.status
+        if status in RETRY_STATUSES:
+            raise RetryableStatus(status)
+        return status
+
+    if controller is None:
+        limiter = semaphore_slot(semaphore)
+        hedge_slot = partial(try_semaphore_slot, semaphore)
+    else:
+        limiter = controller.slot(url)
+        hedge_slot = partial(controller.try_slot, url)
+    async with limiter as slot:
+        try:
+            status = await (
+                attempt() if policy is None else policy.run(url, attempt, hedge_slot)
+            )
+            # 5xx - признак перегрузки хоста
+            slot.failed = status >= 500
+            return url, status
+        except RetryableStatus as e:
+            # Повторы не помогли, возвращаем последний полученный статус
+            slot.failed = True
+            return url, e.status
+
         except TimeoutError:
             # Обработка ошибок таймаута.
+            slot.failed = True
             return url, ERROR_TIMEOUT_STATUS
 
         except ClientError:
             # Обработка клиентских ошибок.
+            slot.failed = True
             return url, CLIENT_ERROR_STATUS
 
         except Exception:
             # Обработка прочих ошибок.
-
+            slot.failed = True
             return url, ERROR_STATUS
 
 
-async def fetch_urls(urls: list[str], file_path: str) -> dict[str, int]:
-    """Функция асинхронного извлечения URL и статуса ответа из списка запросов и записи их в файл"""
-    dict_results: dict[str, int] = {}
-    semaphore = asyncio.Semaphore(REQUESTS_LIMIT)
+async def probe_status(
+    session: ClientSession, url: str, timeout_seconds: int = TIMEOUT_SECONDS
+) -> int:
+    """
+    Статус URL без загрузки тела: запрос HEAD, а если сервер его не поддерживает -
+    GET первого байта (Range), соединение которого закрывается, не дочитывая тело.
+    Ответ 206 на GET с Range означает, что ресурс доступен, и возвращается как 200.
+    """
+    async with session.head(
+        url, timeout=timeout_seconds, allow_redirects=True
+    ) as response:
+        if response.status not in HEAD_REJECTED_STATUSES:
+            return response.status
+    async with session.get(
+        url, timeout=timeout_seconds, headers={"Range": "bytes=0-0"}
+    ) as response:
+        if response.status != 206:
+            # Сервер проигнорировал Range: обрываем соединение вместо чтения всего тела
+            response.close()
+        return 200 if response.status == 206 else response.status
 
-    async with ClientSession() as session:
-        requests = [fetch_url(session, semaphore, url) for url in urls]
 
-        result = await asyncio.gather(*requests)
+async def _iterate(urls: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[str]:
+    if isinstance(urls, AsyncIterable):
+        async for url in urls:
+            yield url
+    else:
+        for url in urls:
+            yield url
+
+
+async def fetch_urls(
+    urls: Iterable[str] | AsyncIterable[str],
+    file_path: str,
+    compression: str | None = None,
+    fsync_every: int | None = None,
+    controller: ConcurrencyController | None = None,
+    policy: RequestPolicy | None = None,
+    metrics: FetchMetrics | None = None,
+    probe: bool = False,
+    max_pending: int = MAX_PENDING,
+    return_results: bool = True,
+    requests_limit: int = REQUESTS_LIMIT,
+) -> dict[str, int] | None:
+    """
+    Функция асинхронного извлечения URL и статуса ответа из списка запросов и записи их в файл.
+    urls может быть обычным или асинхронным итератором: URL читаются по мере запуска запросов,
+    одновременно запущено не больше max_pending запросов. Каждая строка {"url", "status_code"}
+    пишется сразу по готовности в отдельном потоке (см. ResultSink); словарь результатов
+    собирается, только если return_results=True.
+    probe=True включает режим проверки ссылок: HEAD вместо GET, тело не загружается.
+    С controller параллельность подстраивается по каждому хосту, а пул соединений
+    настраивается под его пределы (см. ConcurrencyController).
+    policy включает повторы и хеджирование запросов (см. RequestPolicy).
+    metrics собирает длительности фаз запросов по хостам (см. FetchMetrics).
+    Без controller одновременно выполняется не больше requests_limit запросов.
+    """
+    dict_results: dict[str, int] | None = {} if return_results else None
+    semaphore = asyncio.Semaphore(requests_limit)
 
     try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            for url, status_code in result:
-                dict_results[url] = status_code
-                line = json.dumps(
-                    {"url": url, "status_code": status_code}, ensure_ascii=False
-                )
-                f.write(line + "\n")
+        sink = ResultSink(file_path, compression=compression, fsync_every=fsync_every)
     except Exception as e:
         return f"Ошибка: {e}"
+
+    try:
+        connector = controller.connector() if controller is not None else None
+        trace_configs = [metrics.trace_config()] if metrics is not None else None
+        async with ClientSession(
+            connector=connector, trace_configs=trace_configs
+        ) as session:
+            pending: set[asyncio.Task] = set()
+
+            async def check(url: str) -> None:
+                url, status_code = await fetch_url(
+                    session,
+                    semaphore,
+                    url,
+                    controller=controller,
+                    policy=policy,
+                    probe=probe,
+                )
+                if dict_results is not None:
+                    dict_results[url] = status_code
+                # Строка пишется сразу по готовности, не дожидаясь остальных запросов
+                await sink.put({"url": url, "status_code": status_code})
+
+            try:
+                async for url in _iterate(urls):
+                    if len(pending) >= max_pending:
+                        await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    task = asyncio.create_task(check(url))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                await asyncio.gather(*pending)
+            finally:
+                for task in pending:
+                    task.cancel()
+    finally:
+        await asyncio.to_thread(sink.close)
     return dict_results
 
 
 if __name__ == "__main__":
+    # Запуск из каталога модуля: python fetch_1_0.py
     urls = [
         "https://example.com",
         "https://httpbin.org/status/404",
         "https://nonexistent.url",
     ]
 
-    res = asyncio.run(fetch_urls(urls, FILE_PATH))
+    res = asyncio.run(fetch_urls(urls, Path(__file__).with_name(FILE_PATH)))
     print(res)
@@ -0,0 +1,240 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict, deque
+
+import aiohttp
+
+RETRIES = 2  # Сколько повторов после первой попытки
+BACKOFF_BASE = 0.1  # Базовая пауза перед повтором, секунды
+BACKOFF_MAX = 2.0  # Максимальная пауза перед повтором, секунды
+LATENCY_WINDOW = 1000  # Сколько последних задержек учитывается при расчёте перцентиля
+HEDGE_MIN_SAMPLES = 20  # Меньше стольких наблюдений перцентиль не считается
+MAX_TRACKED_URLS = 10000  # Для скольких последних URL хранятся отдельные метрики
+# Статусы, при которых запрос GET безопасно повторить: перегрузка или временная недоступность
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class RetryableStatus(Exception):
+    """Ответ со статусом, после которого запрос стоит повторить."""
+
+    def __init__(self, status: int):
+        super().__init__(f"Статус ответа {status}")
+        self.status = status
+
+
+# Ошибки идемпотентного запроса, после которых повтор может помочь
+RETRYABLE_ERRORS = (
+    TimeoutError,
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    RetryableStatus,
+)
+
+
+class UrlMetrics:
+    __slots__ = ("attempts", "hedge_wins", "hedges")
+
+    def __init__(self):
+        self.attempts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def __repr__(self):
+        return (
+            f"UrlMetrics(attempts={self.attempts}, hedges={self.hedges}, "
+            f"hedge_wins={self.hedge_wins})"
+        )
+
+
+# Результат хеджа, для которого не нашлось свободного места в пределах параллельности
+_NO_SLOT = object()
+
+
+class RequestPolicy:
+    """
+    Политика выполнения запроса: повторы с экспоненциальной паузой и случайным разбросом
+    (только для ошибок из RETRYABLE_ERRORS), общий срок deadline на все попытки одного URL
+    и хеджирование - если ответа нет дольше hedge_after секунд (или hedge_percentile-го
+    перцентиля наблюдаемых задержек), параллельно отправляется второй запрос и берётся
+    первый успешный ответ. Число попыток и хеджей копится в total и по каждому из
+    последних max_tracked_urls URL в metrics.
+    """
+
+    def __init__(
+        self,
+        retries: int = RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        deadline: float | None = None,
+        hedge_after: float | None = None,
+        hedge_percentile: float | None = None,
+        max_tracked_urls: int = MAX_TRACKED_URLS,
+    ):
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self.latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.max_tracked_urls = max_tracked_urls
+        # Метрики по URL ограничены последними max_tracked_urls адресами, итоги - в total
+        self.metrics: OrderedDict[str, UrlMetrics] = OrderedDict()
+        self.total = UrlMetrics()
+        self.urls = 0
+
+    def hedge_delay(self) -> float | None:
+        """Через сколько секунд без ответа отправлять хедж, None - не хеджировать."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if self.hedge_percentile is None or len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def backoff(self, number: int) -> float:
+        """Пауза перед повтором number: случайная в пределах экспоненциально растущей границы."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**number))
+
+    def url_metrics(self, url: str) -> UrlMetrics:
+        metrics = self.metrics.get(url)
+        if metrics is None:
+            metrics = self.metrics[url] = UrlMetrics()
+            self.urls += 1
+            if len(self.metrics) > self.max_tracked_urls:
+                self.metrics.popitem(last=False)
+        else:
+            self.metrics.move_to_end(url)
+        return metrics
+
+    async def run(self, url: str, attempt, hedge_slot=None):
+        """
+        Выполняет attempt() по политике. attempt - функция без аргументов, возвращающая корутину;
+        она должна выбрасывать RetryableStatus для статусов, после которых стоит повторить запрос.
+        hedge_slot() возвращает асинхронный контекстный менеджер с отдельным местом для хеджа,
+        который отдаёт None, если места сразу нет (например, ConcurrencyController.try_slot):
+        тогда хедж не отправляется. Без hedge_slot хедж не ограничивается.
+        По истечении deadline выбрасывается TimeoutError, после последней попытки - её ошибка.
+        """
+        metrics = self.url_metrics(url)
+        end = None if self.deadline is None else time.monotonic() + self.deadline
+        async with asyncio.timeout(self.deadline):
+            for number in range(self.retries + 1):
+                metrics.attempts += 1
+                self.total.attempts += 1
+                try:
+                    return await self._hedged(attempt, metrics, hedge_slot)
+                except RETRYABLE_ERRORS:
+                    if number == self.retries:
+                        raise
+                    delay = self.backoff(number)
+                    # Если пауза не укладывается в срок, повторять бессмысленно
+                    if end is not None and time.monotonic() + delay >= end:
+                        raise
+                    await asyncio.sleep(delay)
+
+    async def _timed(self, attempt):
+        start = time.monotonic()
+        result = await attempt()
+        self.latencies.append(time.monotonic() - start)
+        return result
+
+    async def _hedge(self, attempt, metrics: UrlMetrics, hedge_slot):
+        if hedge_slot is None:
+            metrics.hedges += 1
+            self.total.hedges += 1
+            return await self._timed(attempt)
+        # Хедж занимает своё место в пределах параллельности, а не место исходного запроса
+        async with hedge_slot() as slot:
+            if slot is None:
+                return _NO_SLOT
+            metrics.hedges += 1
+            self.total.hedges += 1
+            return await self._timed(attempt)
+
+    async def _hedged(self, attempt, metrics: UrlMetrics, hedge_slot=None):
+        delay = self.hedge_delay()
+        if delay is None:
+            return await self._timed(attempt)
+        first = asyncio.ensure_future(self._timed(attempt))
+        hedge = None
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                hedge = asyncio.ensure_future(self._hedge(attempt, metrics, hedge_slot))
+                tasks.add(hedge)
+            failed = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.discard(task)
+                    if task.exception() is not None:
+                        # Ошибка одного запроса не важна, пока второй ещё выполняется
+                        failed = task
+                        continue
+                    if task is hedge:
+                        if task.result() is _NO_SLOT:
+                            # Места для хеджа не нашлось - ждём исходный запрос
+                            continue
+                        metrics.hedge_wins += 1
+                        self.total.hedge_wins += 1
+                    return task.result()
+            return failed.result()
+        finally:
+            # Проигравший запрос отменяется, соединение освобождается до выхода
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def totals(self) -> dict[str, int]:
+        """Суммарные метрики по всем URL, в том числе вытесненным из metrics."""
+        return {
+            "urls": self.urls,
+            "attempts": self.total.attempts,
+            "hedges": self.total.hedges,
+            "hedge_wins": self.total.hedge_wins,
+        }
+
+
+if __name__ == "__main__":
+    # Запуск из каталога модуля: python request_policy.py
+    import sys
+    from functools import partial
+    from pathlib import Path
+
+    if not __package__:
+        sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+        __package__ = "_1_week._3_module"
+
+    from .concurrency import ConcurrencyController
+
+    async def hedged_requests():
+        controller = ConcurrencyController(initial_limit=5)
+        policy = RequestPolicy(hedge_after=0.02)
+        url = "http://example.test/"
+
+        async def attempt():
+            async with controller.slot(url):
+                # Часть ответов медленнее hedge_after: их хеджи выигрывают или отменяются
+                await asyncio.sleep(random.choice((0.005, 0.05)))
+                return "ok"
+
+        for _ in range(20):
+            results = await asyncio.gather(
+                *(
+                    policy.run(url, attempt, partial(controller.try_slot, url))
+                    for _ in range(5)
+                )
+            )
+            assert results == ["ok"] * 5
+        return controller.snapshot()["example.test"], policy.totals()
+
+    state, totals = asyncio.run(hedged_requests())
+    assert totals["hedges"] > 0, totals
+    # Отменённые проигравшие хеджи не считаются ошибками хоста и не уменьшают предел
+    assert state["error_rate"] == 0, state
+    assert state["limit"] >= 5, state
+    print(state, totals)
@@ -0,0 +1,180 @@
+import asyncio
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+BATCH_SIZE = 500  # Сколько записей сериализуется и пишется за один системный вызов
+FLUSH_INTERVAL = 1.0  # Максимальная задержка записи на диск, секунды
+MAX_BUFFER = 10000  # Максимум записей, ожидающих записи; при переполнении put ждёт
+
+_CLOSE = object()
+
+
+def encode_json_line(record) -> bytes:
+    """Сериализует запись в строку JSONL, используя orjson, если он установлен."""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class ResultSink:
+    """
+    Запись результатов в JSONL в отдельном потоке: сериализация и системные вызовы
+    не блокируют цикл событий. Записи копятся пачками по batch_size или flush_interval секунд,
+    буфер ограничен max_buffer записями. Поддерживается сжатие gzip и zstd (если установлен zstandard),
+    fsync_every задаёт, через сколько записей принудительно сбрасывать данные на диск.
+    append=True дописывает в конец существующего файла, on_flush(batch) вызывается в потоке
+    записи после того, как пачка записана в файл. Запись, которую не удалось сериализовать,
+    пропускается с сообщением об ошибке и не попадает в batch для on_flush.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_buffer: int = MAX_BUFFER,
+        compression: str | None = None,
+        fsync_every: int | None = None,
+        encoder=encode_json_line,
+        append: bool = False,
+        on_flush=None,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_every = fsync_every
+        self.encoder = encoder
+        self.on_flush = on_flush
+        self.queue = queue.Queue(maxsize=max_buffer)
+        self.written = 0
+        self.closed = False
+        self.raw_file, self.stream = self._open(path, compression, append)
+        self.thread = threading.Thread(
+            target=self._run, name=f"ResultSink({path})", daemon=True
+        )
+        self.thread.start()
+
+    @staticmethod
+    def _open(path, compression, append):
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError(f"Неизвестный тип сжатия: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Для сжатия zstd нужен пакет zstandard")
+        # Сжатые потоки при дозаписи образуют новый фрагмент, gzip и zstd их читают подряд
+        raw_file = open(path, "ab" if append else "wb")
+        if compression == "gzip":
+            return raw_file, gzip.GzipFile(fileobj=raw_file, mode="wb")
+        if compression == "zstd":
+            return raw_file, zstandard.ZstdCompressor().stream_writer(
+                raw_file, closefd=False
+            )
+        return raw_file, raw_file
+
+    def write(self, record) -> None:
+        """Добавляет запись из синхронного кода, блокируясь, если буфер заполнен."""
+        self.queue.put(record)
+
+    async def put(self, record) -> None:
+        """Добавляет запись из асинхронного кода, не блокируя цикл событий при заполненном буфере."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            await asyncio.to_thread(self.queue.put, record)
+
+    def _run(self) -> None:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                record = None
+            if record is _CLOSE:
+                self._flush(batch)
+                return
+            if record is not None:
+                batch.append(record)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _flush(self, batch) -> None:
+        # Каждая запись сериализуется отдельно, чтобы одна неподходящая запись (например,
+        # целое больше 64 бит для orjson) не отбрасывала всю пачку
+        lines = []
+        encoded = []
+        for record in batch:
+            try:
+                lines.append(self.encoder(record))
+            except Exception as e:
+                print(
+                    f"Запись пропущена, не удалось сериализовать её для '{self.path}': {e}"
+                )
+                continue
+            encoded.append(record)
+        batch = encoded
+        if not batch:
+            return
+        try:
+            self.stream.write(b"".join(lines))
+            self.stream.flush()
+            if self.stream is not self.raw_file:
+                self.raw_file.flush()
+            previous = self.written
+            self.written += len(batch)
+            if self.fsync_every and (
+                self.written // self.fsync_every != previous // self.fsync_every
+            ):
+                os.fsync(self.raw_file.fileno())
+        except Exception as e:
+            print(f"Ошибка при записи результатов в файл '{self.path}': {e}")
+            return
+        if self.on_flush is not None:
+            try:
+                self.on_flush(batch)
+            except Exception as e:
+                print(f"Ошибка в обработчике записи '{self.path}': {e}")
+
+    def close(self) -> None:
+        """Дописывает оставшиеся записи и закрывает файл, даже если поток записи завершился с ошибкой."""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self.thread.is_alive():
+                self.queue.put(_CLOSE)
+                self.thread.join()
+            if self.stream is not self.raw_file:
+                self.stream.close()
+            if self.fsync_every:
+                self.raw_file.flush()
+                os.fsync(self.raw_file.fileno())
+        finally:
+            self.raw_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.to_thread(self.close)
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+# Верхние границы корзин гистограмм задержек, секунды
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Фазы запроса: ожидание соединения из пула, DNS, установка соединения (TCP и TLS,
+# без DNS), ожидание первого байта ответа после отправки запроса, передача тела и весь запрос
+# до получения заголовков ответа. Тело учитывается, только если его дочитали до конца:
+# у ответов HEAD или закрытых без чтения тела фазы body нет
+PHASES = ("queue", "dns", "connect", "ttfb", "body", "total")
+EXPORT_INTERVAL = 10.0
+
+
+class Histogram:
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля сверху: граница корзины, в которую он попадает."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        """Пары (граница, число наблюдений не больше неё) в формате Prometheus."""
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+    def lines(self, name: str, labels: str = "") -> list[str]:
+        """Строки гистограммы в текстовом формате Prometheus с накопленными корзинами."""
+        prefix = f"{labels}," if labels else ""
+        result = []
+        for bound, total in self.cumulative():
+            le = "+Inf" if bound == float("inf") else bound
+            result.append(f'{name}_bucket{{{prefix}le="{le}"}} {total}')
+        suffix = f"{{{labels}}}" if labels else ""
+        result.append(f"{name}_sum{suffix} {self.sum}")
+        result.append(f"{name}_count{suffix} {self.count}")
+        return result
+
+
+class HostStats:
+    __slots__ = (
+        "bytes",
+        "errors",
+        "new_connections",
+        "phases",
+        "requests",
+        "reused",
+        "statuses",
+    )
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.statuses: Counter[int] = Counter()
+        self.errors = 0
+        self.reused = 0
+        self.new_connections = 0
+        self.bytes = 0
+        self.phases = {phase: Histogram(buckets) for phase in PHASES}
+
+
+class FetchMetrics:
+    """
+    Инструментирование запросов aiohttp через TraceConfig: длительности фаз каждого запроса
+    собираются в гистограммы по хостам и фазам, считаются статусы ответов, повторно
+    использованные соединения и полученные байты тела. Подключается передачей trace_config()
+    в ClientSession (параметр metrics у fetch_urls и fetch_and_parse_urls), снимок выгружается
+    в JSON или текстовом формате Prometheus (write, exporting).
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.hosts: dict[str, HostStats] = {}
+
+    def host(self, name: str | None) -> HostStats:
+        name = name or ""
+        stats = self.hosts.get(name)
+        if stats is None:
+            stats = self.hosts[name] = HostStats(self.buckets)
+        return stats
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        config = aiohttp.TraceConfig()
+
+        def mark(name):
+            async def callback(session, ctx, params):
+                setattr(ctx, name, time.perf_counter())
+
+            return callback
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+            ctx.dns_start = ctx.dns_end = None
+            ctx.queued_start = ctx.queued_end = None
+            ctx.create_start = ctx.create_end = None
+            ctx.headers_sent = None
+            ctx.reused = False
+
+        async def on_connection_reuseconn(session, ctx, params):
+            ctx.reused = True
+
+        async def on_request_end(session, ctx, params):
+            now = time.perf_counter()
+            stats = self.host(params.url.host)
+            stats.requests += 1
+            stats.statuses[params.response.status] += 1
+            if ctx.reused:
+                stats.reused += 1
+            elif ctx.create_end is not None:
+                stats.new_connections += 1
+            phases = stats.phases
+            dns = 0.0
+            if ctx.dns_end is not None:
+                dns = ctx.dns_end - ctx.dns_start
+                phases["dns"].observe(dns)
+            if ctx.queued_end is not None:
+                phases["queue"].observe(ctx.queued_end - ctx.queued_start)
+            if ctx.create_end is not None:
+                # Разрешение имени выполняется внутри установки соединения
+                phases["connect"].observe(
+                    max(0.0, ctx.create_end - ctx.create_start - dns)
+                )
+            if ctx.headers_sent is not None:
+                phases["ttfb"].observe(now - ctx.headers_sent)
+            # Запрос учитывается здесь, а не по окончании тела: тело могут не читать вовсе
+            phases["total"].observe(now - ctx.start)
+
+            content = params.response.content
+
+            def on_eof():
+                # Тело дочитано до конца: при потоковом чтении другого сигнала нет
+                stats.bytes += content.total_bytes
+                phases["body"].observe(time.perf_counter() - now)
+
+            content.on_eof(on_eof)
+
+        async def on_request_exception(session, ctx, params):
+            self.host(params.url.host).errors += 1
+
+        config.on_request_start.append(on_request_start)
+        config.on_connection_queued_start.append(mark("queued_start"))
+        config.on_connection_queued_end.append(mark("queued_end"))
+        config.on_connection_create_start.append(mark("create_start"))
+        config.on_connection_create_end.append(mark("create_end"))
+        config.on_connection_reuseconn.append(on_connection_reuseconn)
+        config.on_dns_resolvehost_start.append(mark("dns_start"))
+        config.on_dns_resolvehost_end.append(mark("dns_end"))
+        config.on_request_headers_sent.append(mark("headers_sent"))
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+    def snapshot(self) -> dict:
+        """Снимок метрик по хостам в виде словаря для JSON."""
+        result = {}
+        for name, stats in self.hosts.items():
+            connections = stats.reused + stats.new_connections
+            result[name] = {
+                "requests": stats.requests,
+                "statuses": {
+                    str(status): count
+                    for status, count in sorted(stats.statuses.items())
+                },
+                "errors": stats.errors,
+                "bytes": stats.bytes,
+                "reused_connections": stats.reused,
+                "new_connections": stats.new_connections,
+                "reuse_ratio": stats.reused / connections if connections else None,
+                "phases": {
+                    phase: {
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "p50": histogram.quantile(0.5),
+                        "p99": histogram.quantile(0.99),
+                        "buckets": dict(
+                            zip(
+                                map(str, (*histogram.buckets, "+Inf")), histogram.counts
+                            )
+                        ),
+                    }
+                    for phase, histogram in stats.phases.items()
+                    if histogram.count
+                },
+            }
+        return result
+
+    def prometheus(self) -> str:
+        """Снимок метрик в текстовом формате Prometheus."""
+        lines = ["# TYPE fetch_phase_seconds histogram"]
+        for name, stats in self.hosts.items():
+            for phase, histogram in stats.phases.items():
+                lines += histogram.lines(
+                    "fetch_phase_seconds", f'host="{name}",phase="{phase}"'
+                )
+        counters = (
+            ("fetch_requests_total", "requests"),
+            ("fetch_request_errors_total", "errors"),
+            ("fetch_response_bytes_total", "bytes"),
+            ("fetch_reused_connections_total", "reused"),
+            ("fetch_new_connections_total", "new_connections"),
+        )
+        for metric, attribute in counters:
+            lines.append(f"# TYPE {metric} counter")
+            for name, stats in self.hosts.items():
+                lines.append(f'{metric}{{host="{name}"}} {getattr(stats, attribute)}')
+        lines.append("# TYPE fetch_responses_total counter")
+        for name, stats in self.hosts.items():
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(
+                    f'fetch_responses_total{{host="{name}",status="{status}"}} {count}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def render(self, path) -> str:
+        """Снимок для файла path: JSON для путей *.json, иначе формат Prometheus."""
+        if str(path).endswith(".json"):
+            return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        return self.prometheus()
+
+    def write(self, path) -> None:
+        _write_atomic(path, self.render(path))
+
+    @asynccontextmanager
+    async def exporting(self, path, interval: float | None = EXPORT_INTERVAL):
+        """Выгружает снимок в path каждые interval секунд и при выходе из блока."""
+
+        async def export():
+            # Снимок собирается в цикле событий, где меняются метрики, в поток уходит только запись
+            await asyncio.to_thread(_write_atomic, path, self.render(path))
+
+        async def export_loop():
+            while True:
+                await asyncio.sleep(interval)
+                await export()
+
+        task = asyncio.create_task(export_loop()) if interval else None
+        try:
+            yield self
+        finally:
+            if task is not None:
+                task.cancel()
+            await export()
+
+
+def _write_atomic(path, text: str) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Читатель файла никогда не увидит его наполовину записанным
+    os.replace(temp_path, path)
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import json
+import os
+import statistics
+import sys
+import time
+
+from isolated import IsolatedRunError, peak_rss_mb, run_isolated
+from multi import (
+    N,
+    generate_data,
+    individual_processes_with_queues,
+    multiprocess_pool,
+    shared_memory_pool,
+    sieve_lookup,
+    single_threaded,
+    thread_pool,
+)
+
+SEED = 42
+WARMUP = 1
+REPEATS = 5
+REGRESSION_THRESHOLD = 0.1  # Допустимое замедление медианы относительно базового замера
+
+# Название метода -> (функция, принимает ли она число рабочих)
+METHODS = {
+    "thread_pool": (thread_pool, True),
+    "multiprocess_pool": (multiprocess_pool, True),
+    "processes_with_queues": (individual_processes_with_queues, True),
+    "shared_memory_pool": (shared_memory_pool, True),
+    "sieve_lookup": (sieve_lookup, False),
+    "single_threaded": (single_threaded, False),
+}
+
+FIELDNAMES = [
+    "method",
+    "n",
+    "workers",
+    "repeats",
+    "median_s",
+    "p95_s",
+    "stdev_s",
+    "min_s",
+    "peak_rss_mb",
+]
+
+
+def measure(method, n, workers, seed, warmup, repeats, conn):
+    """Выполняется в отдельном процессе, чтобы пиковая память относилась только к одному методу."""
+    func, uses_workers = METHODS[method]
+    data = generate_data(n, seed)
+    kwargs = {"workers": workers} if uses_workers else {}
+    for _ in range(warmup):
+        func(data, **kwargs)
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(data, **kwargs)
+        durations.append(time.perf_counter() - start)
+    conn.send((durations, peak_rss_mb()))
+    conn.close()
+
+
+def summarize(method, n, workers, durations, rss):
+    p95 = (
+        statistics.quantiles(durations, n=20, method="inclusive")[18]
+        if len(durations) > 1
+        else durations[0]
+    )
+    return {
+        "method": method,
+        "n": n,
+        "workers": workers,
+        "repeats": len(durations),
+        "median_s": statistics.median(durations),
+        "p95_s": p95,
+        "stdev_s": statistics.stdev(durations) if len(durations) > 1 else 0.0,
+        "min_s": min(durations),
+        "peak_rss_mb": rss,
+    }
+
+
+def run_benchmarks(methods, sizes, workers_list, seed, warmup, repeats):
+    """
+    Прогоняет все методы на одинаковых данных для каждого N и числа рабочих.
+    Возвращает строки результатов и описания упавших прогонов.
+    """
+    results = []
+    failures = []
+    for n in sizes:
+        for method in methods:
+            # Последовательным методам число рабочих не важно - меряем их один раз
+            counts = workers_list if METHODS[method][1] else [1]
+            for workers in counts:
+                print(f"Запуск '{method}' n={n} workers={workers}...")
+                try:
+                    durations, rss = run_isolated(
+                        measure, method, n, workers, seed, warmup, repeats
+                    )
+                except IsolatedRunError as e:
+                    print(f"  ошибка: {e}")
+                    failures.append(str(e))
+                    continue
+                row = summarize(method, n, workers, durations, rss)
+                print(
+                    f"  медиана {row['median_s']:.4f} с, p95 {row['p95_s']:.4f} с, "
+                    f"stdev {row['stdev_s']:.4f} с, пик RSS {row['peak_rss_mb']:.1f} МБ"
+                )
+                results.append(row)
+    return results, failures
+
+
+def write_csv(results, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def write_json(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Возвращает строки, медиана которых хуже базовой больше чем на threshold."""
+    base = {(row["method"], row["n"], row["workers"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = base.get((row["method"], row["n"], row["workers"]))
+        if old is not None and row["median_s"] > old["median_s"] * (1 + threshold):
+            regressions.append((row, old))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк вариантов проверки простоты")
+    parser.add_argument("--methods", nargs="+", default=list(METHODS), choices=METHODS)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[N])
+    parser.add_argument("--workers", type=int, nargs="+", default=[os.cpu_count() or 4])
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument(
+        "--csv", default="results.csv", help="Файл для результатов в CSV"
+    )
+    parser.add_argument("--json", help="Файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON с базовыми результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results, failures = run_benchmarks(
+        args.methods, args.sizes, args.workers, args.seed, args.warmup, args.repeats
+    )
+    write_csv(results, args.csv)
+    if args.json:
+        write_json(results, args.json)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = find_regressions(results, baseline, args.threshold)
+        for row, old in regressions:
+            print(
+                f"Регрессия: '{row['method']}' n={row['n']} workers={row['workers']}: "
+                f"{old['median_s']:.4f} с -> {row['median_s']:.4f} с"
+            )
+        if regressions:
+            sys.exit(1)
+    if failures:
+        # Результаты остальных прогонов уже сохранены
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
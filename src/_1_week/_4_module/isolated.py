@@ -0,0 +1,42 @@
+import resource
+import sys
+from multiprocessing import Pipe, Process
+
+
+class IsolatedRunError(RuntimeError):
+    """Процесс замера завершился, не прислав результат."""
+
+
+def peak_rss_mb():
+    """Пиковое потребление памяти текущим процессом и его завершёнными потомками в МБ."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # В Linux ru_maxrss в килобайтах, в macOS - в байтах
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return max(own, children) / scale
+
+
+def run_isolated(target, *args):
+    """
+    Выполняет target(*args, conn) в отдельном процессе и возвращает то, что он отправил в conn.
+    Если процесс упал или завершился без результата, бросает IsolatedRunError вместо ожидания.
+    """
+    parent_conn, child_conn = Pipe(duplex=False)
+    process = Process(target=target, args=(*args, child_conn))
+    process.start()
+    # Пока в родителе открыта копия передающего конца, recv не получит EOF после
+    # падения потомка и будет ждать вечно
+    child_conn.close()
+    try:
+        result = parent_conn.recv()
+        received = True
+    except EOFError:
+        result, received = None, False
+    finally:
+        parent_conn.close()
+        process.join()
+    if not received or process.exitcode != 0:
+        raise IsolatedRunError(
+            f"{target.__name__}{args} завершился с кодом {process.exitcode}"
+        )
+    return result
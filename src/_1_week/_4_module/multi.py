@@ -1,17 +1,20 @@
-import csv
 import os
 import random
-import time
+from array import array
 from concurrent.futures import ThreadPoolExecutor
-from multiprocessing import Pool, Process, Queue
+from math import isqrt
+from multiprocessing import Pool, Process, Queue, shared_memory
 
 N = 1000000
-csv_filename = "results.csv"
+SIEVE_TABLE_LIMIT = 10**7  # До этого значения строим одну таблицу-решето целиком
+SEGMENT_SIZE = 1 << 18  # Размер сегмента для сегментированного решета
+CHUNK_SIZE = 16384  # Размер непрерывного среза для одного задания рабочего процесса
 
 
-def generate_data(n):
-    """Генерирует список из n случайных целых чисел в диапазоне от 1 до 1000."""
-    data = [random.randint(1, 1000) for _ in range(n)]
+def generate_data(n, seed=None):
+    """Генерирует список из n случайных целых чисел в диапазоне от 1 до 1000 (seed делает его воспроизводимым)."""
+    rng = random.Random(seed)
+    data = [rng.randint(1, 1000) for _ in range(n)]
     return data
 
 
@@ -27,34 +30,102 @@ def is_prime(num):
     return True
 
 
-def benchmark_task(func, data_to_process, method_name, results_list):
+def simple_sieve(limit):
+    """Решето Эратосфена: bytearray, где sieve[i] == 1, если i простое, для 0 <= i <= limit."""
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[: min(2, limit + 1)] = bytes(min(2, limit + 1))
+    for i in range(2, isqrt(limit) + 1):
+        if sieve[i]:
+            sieve[i * i :: i] = bytes(len(range(i * i, limit + 1, i)))
+    return sieve
+
+
+def sieve_segment(start, stop, base_primes):
+    """Решето для отрезка [start, stop), base_primes - все простые до sqrt(stop)."""
+    segment = bytearray([1]) * (stop - start)
+    for p in base_primes:
+        if p * p >= stop:
+            break
+        first = max(p * p, (start + p - 1) // p * p)
+        segment[first - start :: p] = bytes(len(range(first, stop, p)))
+    # 0 и 1 не являются простыми
+    for num in range(start, min(2, stop)):
+        segment[num - start] = 0
+    return segment
+
+
+def segmented_sieve(low, high, segment_size=SEGMENT_SIZE, values=None):
+    """
+    Генерирует пары (начало сегмента, решето сегмента) для отрезка [low, high] с памятью O(segment_size).
+    Если задан список values, просеиваются только сегменты, в которые попадают значения.
+    """
+    low = max(low, 0)
+    base_sieve = simple_sieve(isqrt(high))
+    base_primes = [p for p in range(len(base_sieve)) if base_sieve[p]]
+    if values is None:
+        starts = range(low, high + 1, segment_size)
+    else:
+        starts = sorted(
+            {
+                low + (num - low) // segment_size * segment_size
+                for num in values
+                if low <= num <= high
+            }
+        )
+    for start in starts:
+        yield (
+            start,
+            sieve_segment(start, min(start + segment_size, high + 1), base_primes),
+        )
+
+
+def sieve_lookup(data):
     """
-    Запускает заданную функцию для обработки данных и измеряет время выполнения.
+    Проверяет простоту всех чисел списка одним решетом до max(data) и табличным поиском,
+    а при max(data) больше SIEVE_TABLE_LIMIT - сегментированным решетом по нужным сегментам.
+    Возвращает bytearray той же длины, где 1 означает простое число.
     """
-    print(f"\nЗапуск '{method_name}'...")
-    start_time = time.perf_counter()
-    func(data_to_process)
-    end_time = time.perf_counter()
-    duration = end_time - start_time
-    print(f"'{method_name}' завершен за {duration:.4f} секунд.")
-    results_list.append({"Метод": method_name, "Время (секунды)": f"{duration}сек."})
+    if not data:
+        return bytearray()
+    low, high = min(data), max(data)
+    if high < 2:
+        return bytearray(len(data))
+
+    if high <= SIEVE_TABLE_LIMIT:
+        table = simple_sieve(high)
+        if low >= 0:
+            return bytearray(map(table.__getitem__, data))
+        # Отрицательные числа сдвигаем в начало таблицы, заполненное нулями
+        table = bytearray(-low) + table
+        return bytearray(map(table.__getitem__, map((-low).__add__, data)))
+
+    # Большой диапазон: просеиваем только сегменты, в которые попадают значения
+    values = sorted({num for num in data if num >= 2})
+    flags = {}
+    i = 0
+    for start, segment in segmented_sieve(values[0], high, values=values):
+        stop = start + len(segment)
+        while i < len(values) and values[i] < stop:
+            flags[values[i]] = segment[values[i] - start]
+            i += 1
+    return bytearray(flags.get(num, 0) for num in data)
 
 
 # Вариант А: Использование пула потоков с concurrent.futures
-def thread_pool(data):
+def thread_pool(data, workers=None):
     """Используем пул потоков (ThreadPoolExecutor)."""
-    max_workers = os.cpu_count() or 4
+    max_workers = workers or os.cpu_count() or 4
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         result = list(executor.map(is_prime, data))
         return result
 
 
 # Вариант Б: Использование multiprocessing.Pool с пулом процессов
-def multiprocess_pool(data):
+def multiprocess_pool(data, chunk_size=None, workers=None):
     """Используем пул процессов (multiprocessing.Pool)."""
-    num_processes = os.cpu_count() or 4
+    num_processes = workers or os.cpu_count() or 4
     with Pool(processes=num_processes) as pool:
-        result = list(pool.map(is_prime, data))
+        result = list(pool.map(is_prime, data, chunksize=chunk_size))
         return result
 
 
@@ -73,9 +144,9 @@ def worker_process(task_queue, result_queue):
     result_queue.put(None)
 
 
-def individual_processes_with_queues(data):
+def individual_processes_with_queues(data, workers=None):
     """Обработка данных с использованием отдельных процессов и очередей."""
-    num_processes = os.cpu_count() or 4
+    num_processes = workers or os.cpu_count() or 4
     task_queue = Queue()
     result_queue = Queue()
 
@@ -102,6 +173,72 @@ def individual_processes_with_queues(data):
         p.join()
 
 
+# Вариант Д: Пул процессов над общей памятью (multiprocessing.shared_memory)
+_shared_input = None
+_shared_output = None
+
+
+def attach_shared_memory(input_name, output_name):
+    """Инициализатор рабочего процесса: один раз подключается к общим блокам памяти."""
+    global _shared_input, _shared_output
+    _shared_input = shared_memory.SharedMemory(name=input_name)
+    _shared_output = shared_memory.SharedMemory(name=output_name)
+
+
+def process_slice(bounds):
+    """
+    Обрабатывает непрерывный срез входного массива [start, stop) и записывает
+    результаты в битовую карту. start кратен 8, поэтому процессы не пишут в один и тот же байт.
+    """
+    start, stop = bounds
+    numbers = _shared_input.buf.cast("q")[start:stop]
+    bitmap = _shared_output.buf
+    for offset in range(0, stop - start, 8):
+        byte = 0
+        for bit, num in enumerate(numbers[offset : offset + 8]):
+            if is_prime(num):
+                byte |= 1 << bit
+        bitmap[(start + offset) // 8] = byte
+
+
+def unpack_bitmap(bitmap, n):
+    """Преобразует битовую карту результатов в список bool длины n."""
+    return [bool(bitmap[i >> 3] >> (i & 7) & 1) for i in range(n)]
+
+
+def shared_memory_pool(data, chunk_size=CHUNK_SIZE, workers=None):
+    """
+    Входные числа лежат в общей памяти как массив int64, процессы получают только границы
+    срезов и пишут результат в общую битовую карту, поэтому поэлементной сериализации нет.
+    Возвращает битовую карту (бит i равен 1, если data[i] простое).
+    """
+    num_processes = workers or os.cpu_count() or 4
+    n = len(data)
+    # Срезы выравниваем по 8 элементов, чтобы каждый байт битовой карты принадлежал одному процессу
+    chunk_size = max(8, chunk_size - chunk_size % 8)
+    numbers = array("q", data)
+
+    input_shm = shared_memory.SharedMemory(create=True, size=max(1, n * 8))
+    output_shm = shared_memory.SharedMemory(create=True, size=max(1, (n + 7) // 8))
+    try:
+        input_shm.buf[: n * 8] = memoryview(numbers).cast("B")
+        with Pool(
+            processes=num_processes,
+            initializer=attach_shared_memory,
+            initargs=(input_shm.name, output_shm.name),
+        ) as pool:
+            bounds = [
+                (start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)
+            ]
+            pool.map(process_slice, bounds, chunksize=1)
+        return bytearray(output_shm.buf[: (n + 7) // 8])
+    finally:
+        input_shm.close()
+        input_shm.unlink()
+        output_shm.close()
+        output_shm.unlink()
+
+
 def single_threaded(data):
     """Последовательная обработка списка чисел."""
     result = [is_prime(num) for num in data]
@@ -109,52 +246,7 @@ def single_threaded(data):
 
 
 if __name__ == "__main__":
-    benchmark_results = []
-
-    # Вариант А: Пул потоков
-    benchmark_task(
-        thread_pool,
-        generate_data(N),
-        "Пул потоков (concurrent.futures)",
-        benchmark_results,
-    )
-
-    # Вариант Б: Пул процессов
-    benchmark_task(
-        multiprocess_pool,
-        generate_data(N),
-        "Пул процессов (multiprocessing.Pool)",
-        benchmark_results,
-    )
-
-    # Вариант В: Отдельные процессы + Очереди
-    benchmark_task(
-        individual_processes_with_queues,
-        generate_data(N),
-        "Отдельные процессы + Очереди",
-        benchmark_results,
-    )
-
-    # Последовательный вариант
-    benchmark_task(
-        single_threaded,
-        generate_data(N),
-        "Последовательная обработка",
-        benchmark_results,
-    )
-
-    csv_filename = "results.csv"
-
-    fieldnames = ["Метод", "Время (секунды)"]
-
-    try:
-        with open(csv_filename, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-
-            writer.writeheader()
-
-            for row in benchmark_results:
-                writer.writerow(row)
+    # Замеры всех вариантов выполняет benchmark.py, здесь запускаем его с параметрами по умолчанию
+    from benchmark import main
 
-    except Exception as e:
-        print(f"Произошла непредвиденная ошибка: {e}")
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import os
+import random
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+from multi import N, is_prime
+
+BATCH_SIZE = 65536
+REPORT_INTERVAL = 1.0  # Как часто печатать пропускную способность, секунды
+OUTPUT_FILE = "results.bin"
+PRIME_FLAG, COMPOSITE_FLAG = ord("1"), ord("0")
+
+
+def stream_data(n, seed=None):
+    """Генерирует n случайных целых чисел от 1 до 1000 по одному, не создавая список."""
+    rng = random.Random(seed)
+    for _ in range(n):
+        yield rng.randint(1, 1000)
+
+
+def read_numbers(path):
+    """Лениво читает целые числа из файла, по одному на строку."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield int(line)
+
+
+def prime_flags(batch):
+    """Обрабатывает пакет чисел в рабочем процессе: b"1" для простого числа, b"0" для составного."""
+    return bytes(PRIME_FLAG if is_prime(num) else COMPOSITE_FLAG for num in batch)
+
+
+def streaming_pool(
+    numbers,
+    output_path,
+    batch_size=BATCH_SIZE,
+    workers=None,
+    max_pending=None,
+    report_interval=REPORT_INTERVAL,
+):
+    """
+    Потоковая обработка: числа читаются из итератора пакетами по batch_size и раздаются пулу процессов.
+    В работе одновременно не больше max_pending пакетов, поэтому память не зависит от общего числа элементов.
+    Результаты пишутся в output_path в исходном порядке: i-й байт - флаг для i-го числа.
+    Возвращает количество обработанных чисел.
+    """
+    num_processes = workers or os.cpu_count() or 4
+    max_pending = max_pending or 2 * num_processes
+    numbers = iter(numbers)
+    pending = deque()
+    processed = 0
+    start_time = last_report = time.perf_counter()
+
+    with Pool(processes=num_processes) as pool, open(output_path, "wb") as output:
+
+        def write_oldest():
+            # Ждём самый старый пакет, чтобы сохранить порядок результатов
+            nonlocal processed, last_report
+            flags = pending.popleft().get()
+            output.write(flags)
+            processed += len(flags)
+            now = time.perf_counter()
+            if now - last_report >= report_interval:
+                last_report = now
+                print(
+                    f"Обработано {processed} чисел, "
+                    f"{processed / (now - start_time):.0f} чисел/сек."
+                )
+
+        while batch := list(islice(numbers, batch_size)):
+            if len(pending) >= max_pending:
+                # Обратное давление: не читаем новые данные, пока не освободится место
+                write_oldest()
+            pending.append(pool.apply_async(prime_flags, (batch,)))
+        while pending:
+            write_oldest()
+
+    duration = time.perf_counter() - start_time
+    print(
+        f"Готово: {processed} чисел за {duration:.2f} сек., "
+        f"{processed / duration if duration else 0:.0f} чисел/сек."
+    )
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Потоковая проверка простоты с ограниченной памятью"
+    )
+    parser.add_argument("--input", help="Файл с числами, по одному на строку")
+    parser.add_argument(
+        "--n", type=int, default=N, help="Сколько случайных чисел сгенерировать"
+    )
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--max-pending", type=int)
+    args = parser.parse_args()
+
+    source = read_numbers(args.input) if args.input else stream_data(args.n, args.seed)
+    streaming_pool(
+        source,
+        args.output,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        max_pending=args.max_pending,
+    )
@@ -1,42 +1,61 @@
-import asyncio
 import json
+import os
 import re
-import ssl
-import urllib.request
 
 import uvicorn
-
-URL = "https://api.exchangerate-api.com/v4/latest/"
+from metrics import AppMetrics, MetricsMiddleware
+from prepared import PreparedResponse
+from rates_cache import STALE_SECONDS, TTL_SECONDS, RatesCache
+from upstream import RatesClient
 
 CURRENCY_CODE_REGEX = re.compile(r"^[A-Z]{3}$")
 
-
-def fetch_rates(base_currency: str):
-    """Функция для получения курсов валют с API для указанной базовой валюты."""
-    api_url = f"{URL}{base_currency}"
-
-    try:
-        # Создаем контекст SSL для безопасного HTTPS-соединения.
-        context = ssl.create_default_context()
-
-        # Открываем URL и читаем ответ
-        # urllib.request.urlopen блокирует выполнение, пока не получит ответ.
-        with urllib.request.urlopen(api_url, context=context) as response:
-            status_code = response.status
-            response_body_bytes = response.read()
-
-            # Извлекаем Content-Type из заголовков ответа, по умолчанию 'application/json'
-            content_type = response.headers.get("Content-Type", "application/json")
-
-            return status_code, {"Content-Type": content_type}, response_body_bytes
-
-    except Exception as e:
-        print(f"Ошибка: {e}")
-        return 500
-
-
-async def asgi_application(scope, receive, send):
+# Настройки кэша задаются переменными окружения, чтобы их видели все воркеры uvicorn
+CACHE_TTL_SECONDS = float(os.environ.get("RATES_CACHE_TTL", TTL_SECONDS))
+CACHE_STALE_SECONDS = float(os.environ.get("RATES_CACHE_STALE", STALE_SECONDS))
+# Если задана, курсы запрашиваются только для неё, остальные валюты рассчитываются локально
+PIVOT_BASE = os.environ.get("RATES_PIVOT_BASE") or None
+# Включает сэмплирующий профилировщик на /debug/profile?seconds=N
+PROFILING = os.environ.get("RATES_PROFILING", "") not in ("", "0")
+
+# Один клиент, кэш и метрики на процесс: каждый воркер uvicorn импортирует модуль заново
+app_metrics = AppMetrics()
+rates_client = RatesClient(observer=app_metrics.observe_upstream)
+rates_cache = RatesCache(
+    rates_client, ttl=CACHE_TTL_SECONDS, stale=CACHE_STALE_SECONDS, pivot=PIVOT_BASE
+)
+
+INVALID_CURRENCY_RESPONSE = PreparedResponse(
+    400,
+    {"Content-Type": "application/json"},
+    json.dumps({"error": "Неверный формат кода валюты в пути. "}).encode("utf-8"),
+    cacheable=False,
+)
+
+
+async def lifespan(receive, send):
+    """Создаёт клиент API курсов при запуске приложения и закрывает его при остановке."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            try:
+                await rates_client.start()
+            except Exception as e:
+                await send({"type": "lifespan.startup.failed", "message": str(e)})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await rates_cache.close()
+            await rates_client.close()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def rates_application(scope, receive, send):
     """ASGI-приложение, которое проксирует курсы валют для выбранной базовой валюты."""
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
     # Убедимся, что это HTTP-запрос
     if scope["type"] != "http":
         return
@@ -44,42 +63,28 @@ async def asgi_application(scope, receive, send):
     path = scope["path"]
     base_currency = path.strip("/").upper()
 
-    final_status_code = 200
-    final_headers_dict = {"Content-Type": "application/json"}
-    final_response_body_bytes = b""
-
     # Проверяем, соответствует ли извлеченный код валюты ожидаемому формату
     if not base_currency or not CURRENCY_CODE_REGEX.match(base_currency):
         # Если валютный код недействителен, возвращаем 400 Bad Request
-        final_status_code = 400
-        error_message = json.dumps(
-            {"error": "Неверный формат кода валюты в пути. "}
-        ).encode("utf-8")
-        final_response_body_bytes = error_message
+        response = INVALID_CURRENCY_RESPONSE
     else:
-        # Если код валюты валиден, запускаем блокирующую функцию получения данных в отдельном потоке.
-        (
-            final_status_code,
-            final_headers_dict,
-            final_response_body_bytes,
-        ) = await asyncio.to_thread(fetch_rates, base_currency)
-
-    # Преобразуем заголовки из словаря в список кортежей байтов,
-    # как того требует спецификация ASGI (ключи в нижнем регистре).
-    asgi_headers = [
-        (k.lower().encode("ascii"), v.encode("ascii"))
-        for k, v in final_headers_dict.items()
-    ]
-    # Обязательно добавляем заголовок Content-Length
-    asgi_headers.append(
-        (b"content-length", str(len(final_response_body_bytes)).encode("ascii"))
-    )
+        # Если код валюты валиден, берём готовый ответ из кэша; при промахе курсы
+        # запрашиваются через общий пул соединений без отдельного потока.
+        response = await rates_cache.get_rates(base_currency)
+
+    accept_encoding = if_none_match = None
+    for name, value in scope["headers"]:
+        if name == b"accept-encoding":
+            accept_encoding = value.decode("latin-1")
+        elif name == b"if-none-match":
+            if_none_match = value
+    status, asgi_headers, body = response.select(accept_encoding, if_none_match)
 
     # Отправляем событие 'http.response.start' для начала HTTP-ответа
     await send(
         {
             "type": "http.response.start",
-            "status": final_status_code,
+            "status": status,
             "headers": asgi_headers,
         }
     )
@@ -88,12 +93,18 @@ async def asgi_application(scope, receive, send):
     await send(
         {
             "type": "http.response.body",
-            "body": final_response_body_bytes,
+            "body": body,
             "more_body": False,  # Указываем, что это последний фрагмент тела ответа
         }
     )
 
 
+# Точка входа для uvicorn: приложение курсов за middleware метрик (/metrics)
+asgi_application = MetricsMiddleware(
+    rates_application, app_metrics, cache=rates_cache, profiling=PROFILING
+)
+
+
 if __name__ == "__main__":
     uvicorn.run("app:asgi_application", reload=True)
 
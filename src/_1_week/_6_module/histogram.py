@@ -0,0 +1,52 @@
+from bisect import bisect_left
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными верхними границами корзин buckets (по возрастанию)
+    для метрик приложения курсов.
+    """
+
+    __slots__ = ("buckets", "count", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля сверху: граница корзины, в которую он попадает."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+    def cumulative(self):
+        """Пары (граница, число наблюдений не больше неё) в формате Prometheus."""
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            yield bound, total
+
+    def lines(self, name: str, labels: str = "") -> list[str]:
+        """Строки гистограммы в текстовом формате Prometheus с накопленными корзинами."""
+        prefix = f"{labels}," if labels else ""
+        result = []
+        for bound, total in self.cumulative():
+            le = "+Inf" if bound == float("inf") else bound
+            result.append(f'{name}_bucket{{{prefix}le="{le}"}} {total}')
+        suffix = f"{{{labels}}}" if labels else ""
+        result.append(f"{name}_sum{suffix} {self.sum}")
+        result.append(f"{name}_count{suffix} {self.count}")
+        return result
@@ -0,0 +1,325 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from multiprocessing import Process
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+HOST = "127.0.0.1"
+APP_PORT = 8090
+STUB_PORT = 8091
+WORKERS = [1, 2, 4]
+CONCURRENCY = 64
+DURATION = 10.0  # Длительность измерения одного сценария, секунды
+WARMUP = 2.0  # Прогрев кэша перед измерением сценария warm, секунды
+SEED = 42
+SCENARIOS = ("cold", "warm")
+# Холодный кэш - каждый запрос идёт в API, тёплый - курсы не устаревают за время прогона
+SCENARIO_ENV = {
+    "cold": {"RATES_CACHE_TTL": "0", "RATES_CACHE_STALE": "0"},
+    "warm": {"RATES_CACHE_TTL": "3600", "RATES_CACHE_STALE": "0"},
+}
+CURRENCIES = [
+    "USD", "EUR", "GBP", "JPY", "CHF", "CNY", "RUB", "KZT", "TRY", "INR",
+    "BRL", "CAD", "AUD", "NZD", "SEK", "NOK", "DKK", "PLN", "CZK", "HUF",
+    "AED", "SAR", "ILS", "ZAR", "MXN", "SGD", "HKD", "KRW", "THB", "UAH",
+]  # fmt: skip
+APP_DIR = Path(__file__).parent
+
+FIELDNAMES = [
+    "scenario",
+    "workers",
+    "concurrency",
+    "requests",
+    "rps",
+    "p50_ms",
+    "p99_ms",
+    "p999_ms",
+    "error_rate",
+]
+
+
+def make_stub(latency: float, jitter: float, failure_rate: float, seed: int):
+    """
+    Заглушка API курсов: отвечает на /latest/{base} документом в формате exchangerate-api
+    через latency ± jitter секунд, а с вероятностью failure_rate - ошибкой 503.
+    """
+    rng = random.Random(seed)
+    rates = {code: round(rng.uniform(0.01, 100), 4) for code in CURRENCIES}
+
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        if rng.random() < failure_rate:
+            return web.Response(status=503)
+        base = request.match_info["base"]
+        base_rate = rates.get(base, 1.0)
+        return web.json_response(
+            {
+                "base": base,
+                "date": time.strftime("%Y-%m-%d"),
+                "time_last_updated": int(time.time()),
+                "rates": {code: rate / base_rate for code, rate in rates.items()},
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/latest/{base}", handler)
+    return app
+
+
+def serve_stub(host, port, stub_kwargs):
+    """Заглушка работает в своём процессе, чтобы не отнимать CPU у генератора нагрузки."""
+    web.run_app(make_stub(**stub_kwargs), host=host, port=port, print=None)
+
+
+def wait_for_port(host: str, port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def wait_for_app(base_url: str, timeout: float = 15.0) -> None:
+    """
+    Ждёт ответа приложения, а не только открытого порта: при --workers сокет открывает
+    управляющий процесс uvicorn раньше, чем воркеры готовы принимать запросы.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"{base_url}/metrics", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+        time.sleep(0.05)
+
+
+def start_app(workers: int, port: int, env: dict[str, str]) -> subprocess.Popen:
+    """Запускает app.py под uvicorn с workers процессами и настройками из env."""
+    command = [
+        sys.executable,
+        "-m",
+        "uvicorn",
+        "app:asgi_application",
+        "--app-dir",
+        str(APP_DIR),
+        "--host",
+        HOST,
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--log-level",
+        "warning",
+        "--no-access-log",
+    ]
+    return subprocess.Popen(command, env={**os.environ, **env})
+
+
+def stop_app(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def generate_load(base_url, concurrency, duration, seed):
+    """
+    Генератор нагрузки с замкнутым циклом: concurrency задач шлют запросы один за другим
+    в течение duration секунд. Возвращает задержки, статусы и фактическую длительность.
+    """
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def client():
+            while time.perf_counter() < deadline:
+                url = f"{base_url}/{rng.choice(CURRENCIES)}"
+                request_start = time.perf_counter()
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        statuses[response.status] += 1
+                except (aiohttp.ClientError, TimeoutError):
+                    statuses["error"] += 1
+                latencies.append(time.perf_counter() - request_start)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def summarize(scenario, workers, concurrency, latencies, statuses, elapsed):
+    quantiles = (
+        statistics.quantiles(latencies, n=1000, method="inclusive")
+        if len(latencies) > 1
+        else latencies * 999 or [0.0] * 999
+    )
+    requests = sum(statuses.values())
+    errors = requests - statuses.get(200, 0)
+    return {
+        "scenario": scenario,
+        "workers": workers,
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50_ms": quantiles[499] * 1000,
+        "p99_ms": quantiles[989] * 1000,
+        "p999_ms": quantiles[998] * 1000,
+        "error_rate": errors / requests if requests else 0.0,
+    }
+
+
+def run_scenario(scenario, workers, args):
+    env = {
+        "RATES_API_URL": f"http://{HOST}:{args.stub_port}/latest/",
+        **SCENARIO_ENV[scenario],
+    }
+    base_url = f"http://{HOST}:{args.port}"
+    app = start_app(workers, args.port, env)
+    try:
+        wait_for_app(base_url)
+        if scenario == "warm":
+            # Прогрев: у каждого воркера свой кэш, поэтому он прогревается нагрузкой, а не
+            # одним запросом на валюту
+            asyncio.run(
+                generate_load(base_url, args.concurrency, args.warmup, args.seed)
+            )
+        latencies, statuses, elapsed = asyncio.run(
+            generate_load(base_url, args.concurrency, args.duration, args.seed)
+        )
+    finally:
+        stop_app(app)
+    return summarize(scenario, workers, args.concurrency, latencies, statuses, elapsed)
+
+
+def find_regressions(results, baseline, tolerance: float) -> list[str]:
+    """
+    Сравнивает результаты с прошлым прогоном (--json): регрессия - RPS ниже или p99 выше
+    базового больше чем на tolerance.
+    """
+    previous = {(row["scenario"], row["workers"]): row for row in baseline}
+    problems = []
+    for row in results:
+        old = previous.get((row["scenario"], row["workers"]))
+        if old is None:
+            continue
+        name = f"{row['scenario']} workers={row['workers']}"
+        if row["rps"] < old["rps"] * (1 - tolerance):
+            problems.append(f"{name}: RPS {row['rps']:.0f} < {old['rps']:.0f}")
+        if row["p99_ms"] > old["p99_ms"] * (1 + tolerance):
+            problems.append(
+                f"{name}: p99 {row['p99_ms']:.1f} мс > {old['p99_ms']:.1f} мс"
+            )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный тест app.py под uvicorn с заглушкой API курсов"
+    )
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKERS)
+    parser.add_argument(
+        "--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS
+    )
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=DURATION)
+    parser.add_argument("--warmup", type=float, default=WARMUP)
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка API, с")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--port", type=int, default=APP_PORT)
+    parser.add_argument("--stub-port", type=int, default=STUB_PORT)
+    parser.add_argument("--csv", help="сохранить результаты в CSV")
+    parser.add_argument("--json", help="сохранить результаты в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    stub = Process(
+        target=serve_stub,
+        args=(
+            HOST,
+            args.stub_port,
+            {
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "failure_rate": args.failure_rate,
+                "seed": args.seed,
+            },
+        ),
+        daemon=True,
+    )
+    stub.start()
+    results = []
+    failures = []
+    try:
+        wait_for_port(HOST, args.stub_port)
+        for workers in args.workers:
+            for scenario in args.scenarios:
+                print(f"Сценарий '{scenario}', воркеров {workers}...")
+                try:
+                    row = run_scenario(scenario, workers, args)
+                except Exception as e:
+                    # Упавший сценарий не отменяет результаты остальных
+                    print(f"  ошибка: {type(e).__name__} - {e}")
+                    failures.append((scenario, workers))
+                    continue
+                print(
+                    f"  {row['rps']:.0f} запр/с, p50 {row['p50_ms']:.1f} мс, "
+                    f"p99 {row['p99_ms']:.1f} мс, p99.9 {row['p999_ms']:.1f} мс, "
+                    f"ошибок {row['error_rate']:.2%}"
+                )
+                results.append(row)
+    finally:
+        stub.terminate()
+        stub.join()
+
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = find_regressions(results, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"Регрессия: {problem}")
+        if problems:
+            sys.exit(1)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    # Запуск из каталога модуля: python load_benchmark.py --workers 1 2 4
+    main()
@@ -0,0 +1,240 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+from histogram import Histogram
+
+# Верхние границы корзин гистограмм задержек, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_PATH = "/metrics"
+PROFILE_PATH = "/debug/profile"
+LAG_INTERVAL = 0.5  # Как часто измеряется задержка цикла событий, секунды
+PROFILE_SECONDS = 10  # Окно профилирования по умолчанию
+PROFILE_MAX_SECONDS = 60
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP = 50  # Сколько самых частых стеков попадает в ответ
+PROFILE_BUSY_STATUS = 409
+
+
+class AppMetrics:
+    """
+    Метрики процесса приложения: задержки ответов по статусам, запросы к API курсов,
+    запросы в обработке и задержка цикла событий. Обновляются без блокировок, потому что
+    всё происходит в одном цикле событий; у каждого воркера uvicorn свои метрики.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.responses: dict[int, Histogram] = {}
+        self.in_flight = 0
+        self.upstream_requests: Counter[int] = Counter()
+        self.upstream_latency = Histogram(buckets)
+        self.loop_lag = Histogram(buckets)
+        self.loop_lag_max = 0.0
+
+    def observe_response(self, status: int, seconds: float) -> None:
+        histogram = self.responses.get(status)
+        if histogram is None:
+            histogram = self.responses[status] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def observe_upstream(self, status: int, seconds: float) -> None:
+        """Передаётся в RatesClient как observer."""
+        self.upstream_requests[status] += 1
+        self.upstream_latency.observe(seconds)
+
+    async def watch_loop_lag(self, interval: float = LAG_INTERVAL) -> None:
+        """Насколько позже заказанного просыпается sleep: столько ждут готовые к работе задачи."""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(0.0, loop.time() - start - interval)
+            self.loop_lag.observe(lag)
+            self.loop_lag_max = max(self.loop_lag_max, lag)
+
+    def prometheus(self, cache=None) -> str:
+        """Снимок метрик в текстовом формате Prometheus; cache - RatesCache, если он есть."""
+        lines = ["# TYPE rates_http_request_seconds histogram"]
+        for status, histogram in sorted(self.responses.items()):
+            lines += histogram.lines("rates_http_request_seconds", f'status="{status}"')
+        lines.append("# TYPE rates_http_requests_in_flight gauge")
+        lines.append(f"rates_http_requests_in_flight {self.in_flight}")
+
+        lines.append("# TYPE rates_upstream_requests_total counter")
+        for status, count in sorted(self.upstream_requests.items()):
+            lines.append(f'rates_upstream_requests_total{{status="{status}"}} {count}')
+        lines.append("# TYPE rates_upstream_request_seconds histogram")
+        lines += self.upstream_latency.lines("rates_upstream_request_seconds")
+
+        if cache is not None:
+            lines.append("# TYPE rates_cache_lookups_total counter")
+            for result, count in (
+                ("hit", cache.hits),
+                ("stale", cache.stale_hits),
+                ("miss", cache.misses),
+            ):
+                lines.append(f'rates_cache_lookups_total{{result="{result}"}} {count}')
+            lookups = cache.hits + cache.stale_hits + cache.misses
+            # Устаревший ответ тоже отдаётся из кэша, без ожидания API
+            ratio = (cache.hits + cache.stale_hits) / lookups if lookups else 0.0
+            lines.append("# TYPE rates_cache_hit_ratio gauge")
+            lines.append(f"rates_cache_hit_ratio {ratio}")
+            lines.append("# TYPE rates_cache_entries gauge")
+            lines.append(f"rates_cache_entries {len(cache.entries)}")
+
+        lines.append("# TYPE rates_event_loop_lag_seconds histogram")
+        lines += self.loop_lag.lines("rates_event_loop_lag_seconds")
+        lines.append("# TYPE rates_event_loop_lag_max_seconds gauge")
+        lines.append(f"rates_event_loop_lag_max_seconds {self.loop_lag_max}")
+        return "\n".join(lines) + "\n"
+
+
+def sample_stacks(
+    thread_id: int, seconds: float, interval: float = PROFILE_SAMPLE_INTERVAL
+) -> Counter[str]:
+    """
+    Сэмплирующий профилировщик: каждые interval секунд снимает стек потока thread_id
+    и считает одинаковые стеки. Выполняется в отдельном потоке, профилируемый код не меняется.
+    """
+    counts: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            stack.append(f"{code.co_name} ({filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        if stack:
+            counts[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def format_stacks(counts: Counter[str], top: int = PROFILE_TOP) -> str:
+    """Самые частые стеки в свёрнутом формате flamegraph.pl: "корень;...;лист число"."""
+    total = sum(counts.values())
+    lines = [f"# Снимков: {total}"]
+    lines += [f"{stack} {count}" for stack, count in counts.most_common(top)]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: измеряет каждый HTTP-запрос к приложению app и отдаёт метрики
+    на METRICS_PATH. Если profiling включён, GET на PROFILE_PATH?seconds=N в течение N
+    секунд сэмплирует стек потока цикла событий и возвращает самые частые стеки.
+    На запрос добавляется два вызова perf_counter и одна запись в гистограмму.
+    Задача измерения задержки цикла событий останавливается при завершении lifespan
+    или вызовом close().
+    """
+
+    def __init__(
+        self,
+        app,
+        metrics: AppMetrics,
+        cache=None,
+        metrics_path: str = METRICS_PATH,
+        profile_path: str = PROFILE_PATH,
+        profiling: bool = False,
+        lag_interval: float = LAG_INTERVAL,
+    ):
+        self.app = app
+        self.metrics = metrics
+        self.cache = cache
+        self.metrics_path = metrics_path
+        self.profile_path = profile_path
+        self.profiling = profiling
+        self.lag_interval = lag_interval
+        self.lag_task: asyncio.Task | None = None
+        self.profile_lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if self.lag_task is None:
+            # Цикл событий существует только внутри вызова, поэтому задача запускается здесь
+            self.lag_task = asyncio.create_task(
+                self.metrics.watch_loop_lag(self.lag_interval)
+            )
+        if scope["type"] == "lifespan":
+
+            async def receive_wrapper():
+                message = await receive()
+                if message["type"] == "lifespan.shutdown":
+                    await self.close()
+                return message
+
+            await self.app(scope, receive_wrapper, send)
+            return
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path == self.metrics_path:
+            body = self.metrics.prometheus(self.cache).encode("utf-8")
+            await _send_text(send, 200, body, b"text/plain; version=0.0.4")
+            return
+        if self.profiling and path == self.profile_path:
+            await self.profile(scope, send)
+            return
+
+        status = 500  # Если приложение упадёт до ответа
+        metrics = self.metrics
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            metrics.observe_response(status, time.perf_counter() - start)
+
+    async def close(self) -> None:
+        """Останавливает задачу измерения задержки цикла событий."""
+        task, self.lag_task = self.lag_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def profile(self, scope, send):
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        try:
+            seconds = float(query.get("seconds", [PROFILE_SECONDS])[0])
+        except ValueError:
+            seconds = PROFILE_SECONDS
+        seconds = min(max(seconds, 0.1), PROFILE_MAX_SECONDS)
+        if self.profile_lock.locked():
+            await _send_text(
+                send, PROFILE_BUSY_STATUS, "Профилирование уже идёт\n".encode()
+            )
+            return
+        async with self.profile_lock:
+            counts = await asyncio.to_thread(
+                sample_stacks, threading.get_ident(), seconds
+            )
+        await _send_text(send, 200, format_stacks(counts).encode("utf-8"))
+
+
+async def _send_text(send, status, body, content_type=b"text/plain; charset=utf-8"):
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body, "more_body": False})
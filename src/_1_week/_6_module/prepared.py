@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+
+# brotli не входит в зависимости проекта: без установленного пакета вариант br не собирается
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Тело сжимается один раз на обновление курсов и не в цикле событий (см. RatesCache),
+# поэтому уровень сжатия максимальный
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Порядок предпочтения кодировок при одинаковом q в Accept-Encoding
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+NOT_MODIFIED_STATUS = 304
+
+
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """Кодировки из Accept-Encoding с их q: "gzip, br;q=0.5" -> {"gzip": 1.0, "br": 0.5}."""
+    codings = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                q = float(value)
+            except ValueError:
+                q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_encoding(header: str | None, available) -> str | None:
+    """Лучшая кодировка из available, которую принимает клиент; None - без сжатия."""
+    if not header:
+        return None
+    codings = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = codings.get(coding, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def _compress(coding: str, body: bytes) -> bytes:
+    if coding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _asgi_headers(headers: dict[str, str]) -> list[tuple[bytes, bytes]]:
+    # Ключи в нижнем регистре, как того требует спецификация ASGI
+    return [(k.lower().encode("ascii"), v.encode("ascii")) for k, v in headers.items()]
+
+
+class PreparedResponse:
+    """
+    Готовый к отправке ответ: тело и список заголовков ASGI собираются один раз,
+    а не на каждый запрос. Для кэшируемых ответов заранее сжимаются варианты gzip и
+    brotli (если установлен пакет brotli) и считаются сильные ETag, так что запрос
+    с подходящим If-None-Match получает 304 без тела. Сжатие занимает процессор, поэтому
+    кэшируемые ответы в асинхронном коде создаются через asyncio.to_thread.
+    """
+
+    __slots__ = ("etags", "not_modified", "status", "variants")
+
+    def __init__(
+        self, status: int, headers: dict[str, str], body: bytes, cacheable=True
+    ):
+        self.status = status
+        # Кодировка (None - без сжатия) -> (заголовки ASGI, тело)
+        self.variants: dict[str | None, tuple[list, bytes]] = {}
+        # ETag варианта -> заголовки ответа 304 для него
+        self.not_modified: dict[bytes, list] = {}
+        self.etags: dict[str | None, bytes] = {}
+        if not cacheable:
+            self._add(None, dict(headers), body)
+            return
+
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        for coding in (None, *ENCODINGS):
+            encoded = body if coding is None else _compress(coding, body)
+            if coding is not None and len(encoded) >= len(body):
+                continue
+            # У разных кодировок разные представления, поэтому и сильные ETag разные
+            etag = f'"{digest}-{coding}"' if coding else f'"{digest}"'
+            variant_headers = {
+                **headers,
+                "ETag": etag,
+                "Vary": "Accept-Encoding",
+            }
+            if coding is not None:
+                variant_headers["Content-Encoding"] = coding
+            self._add(coding, variant_headers, encoded)
+            self.etags[coding] = etag.encode("ascii")
+            self.not_modified[self.etags[coding]] = _asgi_headers(
+                {"ETag": etag, "Vary": "Accept-Encoding"}
+            )
+
+    def _add(self, coding, headers, body):
+        asgi_headers = _asgi_headers(headers)
+        # Обязательно добавляем заголовок Content-Length
+        asgi_headers.append((b"content-length", str(len(body)).encode("ascii")))
+        self.variants[coding] = (asgi_headers, body)
+
+    def select(
+        self, accept_encoding: str | None, if_none_match: bytes | None
+    ) -> tuple[int, list[tuple[bytes, bytes]], bytes]:
+        """Статус, заголовки ASGI и тело для запроса с указанными заголовками."""
+        coding = choose_encoding(
+            accept_encoding, (c for c in self.variants if c is not None)
+        )
+        if if_none_match and self.etags:
+            # If-None-Match сравнивается слабо: тело то же, в какой бы кодировке клиент
+            # его ни получил, поэтому подходит ETag любого варианта
+            for tag in if_none_match.split(b","):
+                tag = tag.strip().removeprefix(b"W/")
+                if tag == b"*" or tag in self.not_modified:
+                    return (
+                        NOT_MODIFIED_STATUS,
+                        self.not_modified[self.etags[coding]],
+                        b"",
+                    )
+        headers, body = self.variants[coding]
+        return self.status, headers, body
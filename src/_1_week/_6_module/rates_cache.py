@@ -0,0 +1,153 @@
+import asyncio
+import json
+import time
+
+from prepared import PreparedResponse
+from upstream import UPSTREAM_ERROR_STATUS, RatesClient, error_response
+
+TTL_SECONDS = 60  # Сколько секунд курсы считаются свежими
+# Сколько ещё секунд после TTL можно отдавать старые курсы, обновляя их в фоне
+STALE_SECONDS = 300
+UNKNOWN_CURRENCY_STATUS = 404
+
+
+class CacheEntry:
+    __slots__ = ("derived", "expires_at", "rates", "response", "stale_until")
+
+    def __init__(self, response: PreparedResponse, ttl, stale):
+        now = time.monotonic()
+        self.response = response
+        self.expires_at = now + ttl
+        self.stale_until = now + ttl + stale
+        self.rates = None  # Разобранный документ, нужен только для расчёта кросс-курсов
+        # Ответы для других базовых валют: задача сборки, общая для одновременных запросов
+        self.derived: dict[str, asyncio.Task[PreparedResponse]] = {}
+
+
+class RatesCache:
+    """
+    Кэш курсов перед RatesClient. Успешный ответ для базовой валюты хранится ttl секунд,
+    ещё stale секунд отдаётся устаревшим, пока в фоне идёт обновление (stale-while-revalidate),
+    а если обновление не удалось, старые курсы остаются до конца этого окна.
+    Одновременные промахи по одной валюте ждут один запрос к API (single-flight).
+
+    С pivot запрашивается только одна базовая валюта, остальные рассчитываются локально:
+    курс X к C равен rates[C] / rates[X] из ответа для pivot.
+    """
+
+    def __init__(
+        self,
+        client: RatesClient,
+        ttl: float = TTL_SECONDS,
+        stale: float = STALE_SECONDS,
+        pivot: str | None = None,
+    ):
+        self.client = client
+        self.ttl = ttl
+        self.stale = stale
+        self.pivot = pivot
+        self.entries: dict[str, CacheEntry] = {}
+        self.in_flight: dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get_rates(self, base_currency: str) -> PreparedResponse:
+        """Готовый ответ с курсами для базовой валюты или с ошибкой."""
+        key = self.pivot or base_currency
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now < entry.stale_until:
+            if now < entry.expires_at:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                # Ответ отдаётся сразу, обновление идёт в фоне
+                self._refresh(key)
+            return await self._respond(entry, base_currency)
+
+        self.misses += 1
+        result = await asyncio.shield(self._refresh(key))
+        if isinstance(result, CacheEntry):
+            return await self._respond(result, base_currency)
+        return result
+
+    def _refresh(self, key: str) -> asyncio.Task:
+        """Запускает обновление валюты key, если оно ещё не идёт, и возвращает его задачу."""
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        return task
+
+    async def _load(self, key: str) -> CacheEntry | PreparedResponse:
+        status, headers, body = await self.client.fetch_rates(key)
+        if status != 200:
+            # Ошибки не кэшируются; устаревшая запись, если есть, остаётся
+            return PreparedResponse(status, headers, body, cacheable=False)
+        rates = None
+        if self.pivot is not None:
+            try:
+                rates = json.loads(body)
+                valid = isinstance(rates["rates"], dict)
+            except (ValueError, KeyError, TypeError):
+                valid = False
+            if not valid:
+                print(f"Некорректный ответ API курсов для {key}")
+                return PreparedResponse(
+                    *error_response(
+                        UPSTREAM_ERROR_STATUS, "Некорректный ответ сервиса курсов валют"
+                    ),
+                    cacheable=False,
+                )
+        # Сжатие и ETag считаются здесь, один раз на обновление, а не на каждый запрос,
+        # и в отдельном потоке, чтобы не останавливать цикл событий
+        response = await asyncio.to_thread(PreparedResponse, status, headers, body)
+        entry = CacheEntry(response, self.ttl, self.stale)
+        entry.rates = rates
+        self.entries[key] = entry
+        return entry
+
+    async def _respond(self, entry: CacheEntry, base_currency: str) -> PreparedResponse:
+        if self.pivot is None or base_currency == self.pivot:
+            return entry.response
+        task = entry.derived.get(base_currency)
+        if task is None:
+            body = self._derive(entry.rates, base_currency)
+            if body is None:
+                return PreparedResponse(
+                    *error_response(
+                        UNKNOWN_CURRENCY_STATUS, f"Неизвестная валюта {base_currency}"
+                    ),
+                    cacheable=False,
+                )
+            # Кросс-курсы считаются и сжимаются один раз на каждое обновление курсов pivot,
+            # сжатие - в отдельном потоке
+            task = asyncio.ensure_future(
+                asyncio.to_thread(
+                    PreparedResponse, 200, {"Content-Type": "application/json"}, body
+                )
+            )
+            entry.derived[base_currency] = task
+        # Отмена одного запроса не отменяет сборку ответа для остальных
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _derive(document: dict, base_currency: str) -> bytes | None:
+        rates = document["rates"]
+        base_rate = rates.get(base_currency)
+        if not base_rate:
+            return None
+        derived = dict(document)
+        derived["base"] = base_currency
+        derived["rates"] = {code: rate / base_rate for code, rate in rates.items()}
+        derived["rates"][base_currency] = 1
+        return json.dumps(derived).encode("utf-8")
+
+    async def close(self) -> None:
+        """Отменяет фоновые обновления при остановке приложения."""
+        tasks = list(self.in_flight.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,99 @@
+import json
+import os
+import ssl
+import time
+from collections.abc import Callable
+
+import aiohttp
+
+# Адрес API курсов; переменная окружения позволяет направить все воркеры на заглушку
+URL = os.environ.get("RATES_API_URL", "https://api.exchangerate-api.com/v4/latest/")
+TIMEOUT_SECONDS = 10  # Общий таймаут запроса к API курсов
+CONNECT_TIMEOUT_SECONDS = 3  # Таймаут установки соединения
+POOL_LIMIT = 100  # Максимум одновременных соединений к API на процесс
+KEEPALIVE_TIMEOUT = 30  # Сколько секунд держать простаивающее соединение открытым
+DNS_CACHE_TTL = 300
+UPSTREAM_ERROR_STATUS = 502
+UPSTREAM_TIMEOUT_STATUS = 504
+
+
+def error_response(status: int, message: str) -> tuple[int, dict[str, str], bytes]:
+    body = json.dumps({"error": message}, ensure_ascii=False).encode("utf-8")
+    return status, {"Content-Type": "application/json"}, body
+
+
+class RatesClient:
+    """
+    Долгоживущий асинхронный клиент API курсов: одна сессия aiohttp на процесс с пулом
+    keep-alive соединений и одним SSL-контекстом, поэтому запросы не платят за загрузку
+    хранилища сертификатов и TLS-рукопожатие каждый раз. Создаётся при запуске ASGI-приложения
+    (start) и закрывается при остановке (close). observer, если задан, вызывается после
+    каждого запроса со статусом ответа (или ошибки) и длительностью в секундах.
+    """
+
+    def __init__(
+        self,
+        base_url: str = URL,
+        timeout_seconds: float = TIMEOUT_SECONDS,
+        connect_timeout_seconds: float = CONNECT_TIMEOUT_SECONDS,
+        pool_limit: int = POOL_LIMIT,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        observer: Callable[[int, float], None] | None = None,
+    ):
+        self.base_url = base_url
+        self.observer = observer
+        self.timeout = aiohttp.ClientTimeout(
+            total=timeout_seconds, connect=connect_timeout_seconds
+        )
+        self.pool_limit = pool_limit
+        self.keepalive_timeout = keepalive_timeout
+        self.session: aiohttp.ClientSession | None = None
+
+    async def start(self) -> None:
+        if self.session is not None:
+            return
+        # SSL-контекст создаётся один раз: create_default_context каждый раз читает хранилище сертификатов
+        ssl_context = ssl.create_default_context()
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_limit,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            ssl=ssl_context,
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def fetch_rates(
+        self, base_currency: str
+    ) -> tuple[int, dict[str, str], bytes]:
+        """Получает курсы валют для базовой валюты: (статус, заголовки, тело ответа)."""
+        if self.session is None:
+            # Сервер запущен без поддержки lifespan: создаём сессию при первом запросе
+            await self.start()
+        start = time.perf_counter()
+        result = await self._fetch(base_currency)
+        if self.observer is not None:
+            self.observer(result[0], time.perf_counter() - start)
+        return result
+
+    async def _fetch(self, base_currency: str) -> tuple[int, dict[str, str], bytes]:
+        try:
+            async with self.session.get(f"{self.base_url}{base_currency}") as response:
+                body = await response.read()
+                # Извлекаем Content-Type из заголовков ответа, по умолчанию 'application/json'
+                content_type = response.headers.get("Content-Type", "application/json")
+                return response.status, {"Content-Type": content_type}, body
+        except TimeoutError:
+            print(f"Таймаут запроса курсов для {base_currency}")
+            return error_response(
+                UPSTREAM_TIMEOUT_STATUS, "Сервис курсов валют не ответил вовремя"
+            )
+        except aiohttp.ClientError as e:
+            print(f"Ошибка: {e}")
+            return error_response(
+                UPSTREAM_ERROR_STATUS, "Сервис курсов валют недоступен"
+            )